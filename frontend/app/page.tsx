@@ -109,16 +109,34 @@ export default function ConversationPage() {
           buffer = lines.pop() || ""; // Keep incomplete chunk
 
           for (const line of lines) {
-            if (line.startsWith("event: trace")) {
+            if (line.startsWith("event: trace_batch")) {
               const dataLine = line.split("\n").find(l => l.startsWith("data: "));
               if (dataLine) {
                 const data = JSON.parse(dataLine.slice(6));
                 setAgentResult(prev => {
                   const existing = prev?.agent_traces || [];
-                  return { ...prev!, agent_traces: [...existing, data.trace] };
+                  return { ...prev!, agent_traces: [...existing, ...data.traces] };
                 });
                 if (data.run_id) setRunId(data.run_id);
               }
+            } else if (line.startsWith("event: token")) {
+              const dataLine = line.split("\n").find(l => l.startsWith("data: "));
+              if (dataLine) {
+                const data = JSON.parse(dataLine.slice(6));
+                setAgentResult(prev => ({
+                  ...prev!,
+                  final_synthesis: (prev?.final_synthesis || "") + data.chunk,
+                }));
+              }
+            } else if (line.startsWith("event: section")) {
+              const dataLine = line.split("\n").find(l => l.startsWith("data: "));
+              if (dataLine) {
+                const data = JSON.parse(dataLine.slice(6));
+                setAgentResult(prev => ({
+                  ...prev!,
+                  sections: { ...(prev?.sections || {}), [data.key]: data.content },
+                }));
+              }
             } else if (line.startsWith("event: complete")) {
               const dataLine = line.split("\n").find(l => l.startsWith("data: "));
               if (dataLine) {
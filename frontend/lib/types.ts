@@ -8,6 +8,7 @@ export interface AgentTrace {
   completed_at: string;
   duration_ms?: number;
   metadata?: Record<string, unknown>;
+  usage?: Record<string, number>;
 }
 
 export interface CouncilSections {
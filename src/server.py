@@ -4,28 +4,34 @@ FastAPI server that exposes the Theory Council pipeline and a lightweight chat e
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 import os
-from typing import Any, Dict, List, Literal, Optional, TypedDict
+import sys
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Literal, NotRequired, Optional, TypedDict
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException
+import orjson
+from cachetools import LRUCache
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from pydantic_core import to_json
 
-from theory_council.chat import ChatMessage as ChatMessageDict, astream_chat_response
+from theory_council.chat import ChatMessage as ChatMessageDict, astream_chat_response, warm_chat_config
 from theory_council.config import get_langsmith_settings
-from theory_council.conversation import ConversationOutcome, process_conversation_turn
+from theory_council.conversation import aprocess_conversation_turn
 from theory_council.graph import (
     CouncilPipelineResult,
-    CouncilState,
+    parse_integrator_sections,
     run_council_pipeline,
-    stream_council_pipeline,
-    astream_council_pipeline,
+    astream_council_events,
+    merge_council_update,
 )
-from theory_council.orchestration import InMemorySessionStore
+from theory_council.orchestration import build_session_store
 
 logger = logging.getLogger("theory_council.server")
 logging.basicConfig(level=logging.INFO)
@@ -39,10 +45,27 @@ for key, value in langsmith_settings.items():
 if langsmith_settings.get("LANGCHAIN_API_KEY") and not os.environ.get("LANGCHAIN_TRACING_V2"):
     os.environ["LANGCHAIN_TRACING_V2"] = "true"
 
+def _orjson_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        # pydantic-core writes the model straight to JSON bytes; orjson embeds them without a dict round-trip.
+        return orjson.Fragment(to_json(value))
+    return str(value)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson instead of the stdlib encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default)
+
+
 app = FastAPI(
     title="Theory Council API",
     description="Expose the LangGraph-based Theory Council workflow and supporting chat helpers.",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
 @app.on_event("startup")
@@ -61,6 +84,8 @@ async def startup_event():
             logger.info("Syncing Gemini File Search Stores...")
             loop = asyncio.get_running_loop()
             await loop.run_in_executor(None, partial(sync_all_theory_stores, CONTEXT_DIR))
+            # Resolve the chat File Search store now so the first chat turn does not wait on it.
+            await loop.run_in_executor(None, warm_chat_config)
         else:
             logger.info("GOOGLE_API_KEY not set, skipping Gemini RAG sync.")
             
@@ -68,16 +93,18 @@ async def startup_event():
         logger.error("Failed to sync Gemini store on startup: %s", e)
 
 _default_origins = "http://localhost:3000,http://127.0.0.1:3000"
-ALLOWED_ORIGINS = [
-    origin.strip()
+ALLOWED_ORIGINS = frozenset(
+    origin.strip().rstrip("/")
     for origin in os.environ.get("COUNCIL_ALLOWED_ORIGINS", _default_origins).split(",")
     if origin.strip()
-]
+)
+# Browsers reject credentialed responses for a wildcard origin, so "*" also disables credentials.
+_ALLOW_ANY_ORIGIN = not ALLOWED_ORIGINS or "*" in ALLOWED_ORIGINS
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=ALLOWED_ORIGINS or ["*"],
-    allow_credentials=True,
+    allow_origins=["*"] if _ALLOW_ANY_ORIGIN else ALLOWED_ORIGINS,
+    allow_credentials=not _ALLOW_ANY_ORIGIN,
     allow_methods=["*"],
     allow_headers=["*"],
 )
@@ -86,10 +113,30 @@ app.add_middleware(
 class RunRecord(TypedDict):
     result: CouncilPipelineResult
     session_id: Optional[str]
+    # Built lazily on first read; the streaming path never needs the pydantic model.
+    response: NotRequired[CouncilRunResponse]
 
 
-RUN_LOG: Dict[str, RunRecord] = {}
-SESSION_STORE = InMemorySessionStore()
+# Bounded so long-running servers do not accumulate every council result; sessions keep the latest run.
+RUN_LOG: LRUCache[str, RunRecord] = LRUCache(maxsize=int(os.environ.get("COUNCIL_RUN_LOG_SIZE", "1024")))
+# COUNCIL_SESSION_BACKEND=redis shares sessions and runs across workers; RUN_LOG stays a per-process cache.
+SESSION_STORE = build_session_store()
+
+# Council runs hold a worker for the whole multi-agent pipeline, so they get their own pool instead of
+# competing with every other sync endpoint for Starlette's shared threadpool.
+COUNCIL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("COUNCIL_MAX_WORKERS", "8")),
+    thread_name_prefix="council",
+)
+
+# Chat tokens are coalesced into fewer SSE frames; set COUNCIL_SSE_UNBUFFERED=1 to emit one frame per token.
+SSE_TOKEN_FLUSH_CHARS = 512
+SSE_TOKEN_FLUSH_INTERVAL_S = 0.02
+SSE_UNBUFFERED_TOKENS = os.environ.get("COUNCIL_SSE_UNBUFFERED", "").lower() in {"1", "true", "yes"}
+# How often streaming endpoints check whether the client has gone away.
+SSE_DISCONNECT_POLL_S = 0.5
+# Chunks the Gemini reader may run ahead of a slow client before it has to wait.
+SSE_PREFETCH_CHUNKS = 64
 
 
 class AgentTraceModel(BaseModel):
@@ -100,6 +147,7 @@ class AgentTraceModel(BaseModel):
     completed_at: str
     duration_ms: Optional[float] = None
     metadata: Optional[Dict[str, Any]] = None
+    usage: Optional[Dict[str, int]] = None
 
 
 class CouncilResultModel(BaseModel):
@@ -141,9 +189,6 @@ class ChatMessageModel(BaseModel):
     role: Literal["system", "user", "assistant"]
     content: str
 
-    def to_dict(self) -> ChatMessageDict:
-        return {"role": self.role, "content": self.content}
-
 
 class ConversationRequest(BaseModel):
     messages: List[ChatMessageModel]
@@ -168,14 +213,29 @@ class ConversationResponseModel(BaseModel):
     auto_disable_agent: bool = False
 
 
-def _store_run(result: CouncilPipelineResult, session_id: Optional[str] = None) -> str:
-    run_id = uuid4().hex
+def _store_run(
+    result: CouncilPipelineResult,
+    session_id: Optional[str] = None,
+    run_id: Optional[str] = None,
+) -> str:
+    run_id = run_id or uuid4().hex
     RUN_LOG[run_id] = {"result": result, "session_id": session_id}
     return run_id
 
 
+def _get_run_response(run_id: str, record: RunRecord) -> CouncilRunResponse:
+    # Runs are immutable once stored, so build the response model once and reuse it on every read.
+    response = record.get("response")
+    if response is None:
+        response = _make_council_run_response(run_id, record["result"], record["session_id"])
+        record["response"] = response
+    return response
+
+
 def _build_council_result_model(result: CouncilPipelineResult) -> CouncilResultModel:
-    return CouncilResultModel(**result)
+    # The pipeline output is already schema-conformant, so skip pydantic validation.
+    traces = [AgentTraceModel.model_construct(**trace) for trace in result["agent_traces"]]
+    return CouncilResultModel.model_construct(**{**result, "agent_traces": traces})
 
 
 def _make_council_run_response(
@@ -189,60 +249,168 @@ def _make_council_run_response(
     )
 
 
-def _format_sse(event: str, payload: Dict[str, Any]) -> str:
-    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+# Both streams send token frames as {"chunk": ...}; council frames add the producing "agent_key".
+SSE_EVENTS = ("started", "token", "trace_batch", "section", "complete", "error")
+_SSE_PREFIXES: Dict[str, bytes] = {name: f"event: {name}\ndata: ".encode() for name in SSE_EVENTS}
+
+
+# Strong references keep fire-and-forget store writes from being garbage-collected mid-flight.
+_BACKGROUND_TASKS: set[asyncio.Task[Any]] = set()
+
+
+def _run_in_background(func: Any, *args: Any) -> None:
+    """Schedule a blocking store write off the event loop without awaiting it."""
+    task = asyncio.create_task(asyncio.to_thread(func, *args))
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_finish_background_task)
+
+
+def _finish_background_task(task: asyncio.Task[Any]) -> None:
+    _BACKGROUND_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background store write failed: %s", task.exception())
+
+
+@asynccontextmanager
+async def _cancel_on_disconnect(request: Request) -> AsyncIterator[None]:
+    """
+    Cancel the enclosed stream once the client disconnects so in-flight LLM calls stop with it.
+    """
+    stream_task = asyncio.current_task()
+    disconnected = asyncio.Event()
+
+    async def watch() -> None:
+        while not await request.is_disconnected():
+            await asyncio.sleep(SSE_DISCONNECT_POLL_S)
+        disconnected.set()
+        stream_task.cancel()
+
+    watcher = asyncio.create_task(watch())
+    try:
+        yield
+    except asyncio.CancelledError:
+        if not disconnected.is_set():
+            raise
+        # The cancellation was ours; end the stream quietly instead of failing the request task.
+        stream_task.uncancel()
+        logger.info("Client disconnected, stream cancelled.")
+    finally:
+        watcher.cancel()
+
+
+_STREAM_DONE = object()
+
 
+async def _prefetch(source: AsyncIterator[str], maxsize: int = SSE_PREFETCH_CHUNKS) -> AsyncIterator[str]:
+    """
+    Read ``source`` in a producer task through a bounded queue.
+
+    The upstream read overlaps with SSE writes, and a slow client pauses the producer
+    once ``maxsize`` chunks are waiting instead of buffering without limit.
+    """
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=maxsize)
+
+    async def produce() -> None:
+        try:
+            async for item in source:
+                await queue.put(item)
+        except Exception as exc:
+            await queue.put(exc)
+        else:
+            await queue.put(_STREAM_DONE)
 
-@app.post("/council/run", response_model=CouncilRunResponse)
-def council_run_endpoint(payload: CouncilRunRequest) -> CouncilRunResponse:
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+
+
+def _format_sse(event: str, payload: Dict[str, Any]) -> bytes:
+    # orjson emits UTF-8 bytes directly, so StreamingResponse can send frames without re-encoding.
+    return _SSE_PREFIXES[event] + orjson.dumps(payload, default=_orjson_default) + b"\n\n"
+
+
+# Handlers build their models without validation and return ORJSONResponse directly, so FastAPI
+# does not re-validate them; `responses=` keeps the schemas in the OpenAPI docs.
+@app.post("/council/run", responses={200: {"model": CouncilRunResponse}})
+async def council_run_endpoint(
+    payload: CouncilRunRequest, background: BackgroundTasks
+) -> ORJSONResponse:
     session_id = payload.session_id or uuid4().hex
-    run_result = run_council_pipeline(payload.problem, metadata=payload.metadata)
+    loop = asyncio.get_running_loop()
+    run_result = await loop.run_in_executor(
+        COUNCIL_EXECUTOR,
+        partial(run_council_pipeline, payload.problem, metadata=payload.metadata),
+    )
     run_id = _store_run(run_result, session_id=session_id)
-    SESSION_STORE.record_council_run(session_id, run_id, run_result)
-    return _make_council_run_response(run_id, run_result, session_id)
+    background.add_task(SESSION_STORE.record_council_run, session_id, run_id, run_result)
+    return ORJSONResponse(_get_run_response(run_id, RUN_LOG[run_id]), background=background)
 
 
-@app.get("/council/run/{run_id}", response_model=CouncilRunResponse)
-def get_council_run(run_id: str) -> CouncilRunResponse:
+@app.get("/council/run/{run_id}", responses={200: {"model": CouncilRunResponse}})
+def get_council_run(run_id: str) -> ORJSONResponse:
     record = RUN_LOG.get(run_id)
     if not record:
-        raise HTTPException(status_code=404, detail=f"Run id '{run_id}' not found.")
-    return _make_council_run_response(run_id, record["result"], record.get("session_id"))
+        # The run may have been produced by another worker or evicted locally.
+        stored = SESSION_STORE.get_run_record(run_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail=f"Run id '{run_id}' not found.")
+        record = {"result": stored["result"], "session_id": stored["session_id"]}
+        RUN_LOG[run_id] = record
+    return ORJSONResponse(_get_run_response(run_id, record))
 
 
 @app.post("/council/run/stream")
-async def stream_council_run(payload: CouncilRunRequest) -> StreamingResponse:
+async def stream_council_run(payload: CouncilRunRequest, request: Request) -> StreamingResponse:
     session_id = payload.session_id or uuid4().hex
 
     async def event_stream():
         yield _format_sse("started", {"session_id": session_id})
 
-        # We need to collect the final result to store it, so we track state
-        final_state: Optional[CouncilState] = None
+        # Node deltas are folded into this state so the final result can be stored.
+        final_state: Dict[str, Any] = {}
 
-        try:
+        # Cancelling on disconnect unwinds LangGraph's astream, which stops the remaining agents.
+        async with _cancel_on_disconnect(request):
             # Iterate over the async generator
             # This allows proper cancellation if the client disconnects
-            history_dicts = [m.to_dict() for m in (payload.chat_history or [])]
-            async for state in astream_council_pipeline(
+            history_dicts = [{"role": m.role, "content": m.content} for m in (payload.chat_history or [])]
+            async for mode, event in astream_council_events(
                 payload.problem,
                 metadata=payload.metadata,
                 chat_history=history_dicts,
             ):
-                final_state = state
-                # Emit the NEWEST trace if present
-                traces = state.get("agent_traces") or []
-                if traces:
-                    latest_trace = traces[-1]
-                    temp_run_id = "pending-run"
-                    yield _format_sse("trace", {"trace": latest_trace, "run_id": temp_run_id})
+                if mode == "custom":
+                    # Integrator sections are forwarded as soon as each one is complete.
+                    if "section" in event:
+                        yield _format_sse(
+                            "section",
+                            {"key": event["section"], "content": event["content"], "run_id": "pending-run"},
+                        )
+                    # The synthesis streams token by token; other agents' chunks stay server-side.
+                    elif event.get("agent_key") == "integrator":
+                        yield _format_sse("token", {"agent_key": "integrator", "chunk": event["chunk"]})
+                    continue
+                for delta in event.values():
+                    if not delta:
+                        continue
+                    merge_council_update(final_state, delta)
+                    # Each delta carries only the traces its node added.
+                    new_traces = delta.get("agent_traces")
+                    if new_traces:
+                        yield _format_sse("trace_batch", {"traces": new_traces, "run_id": "pending-run"})
 
             if final_state:
                 # Reconstruct the full pipeline result
                 final_text = (final_state.get("final_synthesis") or "").strip()
-                from theory_council.graph import _parse_integrator_sections
-
-                sections = _parse_integrator_sections(final_text)
+                sections = parse_integrator_sections(final_text)
                 full_result: CouncilPipelineResult = {
                     "raw_problem": payload.problem,
                     "framed_problem": final_state.get("framed_problem"),
@@ -254,31 +422,35 @@ async def stream_council_run(payload: CouncilRunRequest) -> StreamingResponse:
                     "sections": sections,
                     "agent_traces": final_state.get("agent_traces") or [],
                 }
-                
-                run_id = _store_run(full_result, session_id=session_id)
-                SESSION_STORE.record_council_run(session_id, run_id, full_result)
-                
-                response_payload = _make_council_run_response(run_id, full_result, session_id)
-                yield _format_sse("complete", {"run": response_payload.model_dump()})
-
-        except asyncio.CancelledError:
-            logger.info("Client disconnected, stream cancelled.")
-            # We explicitly raise so FastAPI knows it was cancelled, though usually it handles it.
-            # LangGraph's astream should have caught this and stopped the graph.
-            raise
+
+                run_id = uuid4().hex
+                # full_result already has the CouncilRunResponse shape; serialize it directly.
+                response_payload = {
+                    "run_id": run_id,
+                    "status": "completed",
+                    "result": full_result,
+                    "session_id": session_id,
+                }
+                yield _format_sse("complete", {"run": response_payload})
+                # Persist only after the final frame is on the wire.
+                _store_run(full_result, session_id=session_id, run_id=run_id)
+                _run_in_background(SESSION_STORE.record_council_run, session_id, run_id, full_result)
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
-@app.post("/conversation/send", response_model=ConversationResponseModel)
-def conversation_endpoint(payload: ConversationRequest) -> ConversationResponseModel:
+@app.post("/conversation/send", responses={200: {"model": ConversationResponseModel}})
+async def conversation_endpoint(
+    payload: ConversationRequest, background: BackgroundTasks
+) -> ORJSONResponse:
     if not payload.messages:
         raise HTTPException(status_code=400, detail="At least one message is required.")
 
     session_id = payload.session_id or uuid4().hex
-    chat_messages = [msg.to_dict() for msg in payload.messages]
+    chat_messages = [{"role": msg.role, "content": msg.content} for msg in payload.messages]
 
-    outcome = process_conversation_turn(
+    # Chat and council turns await the LLM on the event loop instead of holding a threadpool worker.
+    outcome = await aprocess_conversation_turn(
         session_store=SESSION_STORE,
         session_id=session_id,
         messages=chat_messages,
@@ -292,55 +464,90 @@ def conversation_endpoint(payload: ConversationRequest) -> ConversationResponseM
     if outcome.get("agent_result"):
         run_result = outcome["agent_result"]  # type: ignore[index]
         run_id = _store_run(run_result, session_id=session_id)
-        SESSION_STORE.record_council_run(session_id, run_id, run_result)
-        agent_result_model = _build_council_result_model(run_result)
-
-    response_messages = [ChatMessageModel(**message) for message in outcome["messages"]]
-    assistant_message = ChatMessageModel(**outcome["assistant_message"])
+        background.add_task(SESSION_STORE.record_council_run, session_id, run_id, run_result)
+        agent_result_model = _get_run_response(run_id, RUN_LOG[run_id]).result
+
+    # Messages come from our own conversation pipeline, so skip pydantic validation.
+    response_messages = [
+        ChatMessageModel.model_construct(role=message["role"], content=message["content"])
+        for message in outcome["messages"]
+    ]
+    assistant_message = ChatMessageModel.model_construct(
+        role=outcome["assistant_message"]["role"],
+        content=outcome["assistant_message"]["content"],
+    )
 
-    return ConversationResponseModel(
+    response = ConversationResponseModel.model_construct(
+        session_id=session_id,
+        mode=outcome["mode"],
+        assistant_message=assistant_message,
+        messages=response_messages,
+        agent_result=agent_result_model,
         run_id=run_id,
         auto_disable_agent=outcome.get("auto_disable_agent", False),
     )
+    return ORJSONResponse(response, background=background)
 
 
 @app.post("/conversation/send/stream")
-async def stream_conversation_endpoint(payload: ConversationRequest) -> StreamingResponse:
+async def stream_conversation_endpoint(payload: ConversationRequest, request: Request) -> StreamingResponse:
     session_id = payload.session_id or uuid4().hex
     # For now, this endpoint assumes agent_enabled=False or is for the "chat" mode.
     # If the user wants the agent, they should use /council/run/stream.
     
     # We update session history *optimistically* here, or we can wait until completion.
     # To be safe, usually we append the user message first.
-    user_msg_dict = [msg.to_dict() for msg in payload.messages]
+    user_msg_dict = [{"role": msg.role, "content": msg.content} for msg in payload.messages]
     # We only really need to append the *new* user message if it's not in store,
     # but the simplest valid approach for this app's architecture is to replace history 
     # with what the client sees, as the client is the source of truth for history order.
-    SESSION_STORE.replace_messages(session_id, user_msg_dict)
+    # Off the event loop: with the Redis backend this is a network round trip.
+    await asyncio.to_thread(SESSION_STORE.replace_messages, session_id, user_msg_dict)
 
     async def event_stream():
         # Yield session ID immediately
         yield _format_sse("started", {"session_id": session_id})
 
-        full_content = ""
+        parts: List[str] = []
+        loop = asyncio.get_running_loop()
+        pending: List[str] = []
+        pending_chars = 0
+        last_flush = loop.time()
         try:
-            async for chunk in astream_chat_response(
-                user_msg_dict, 
-                metadata=payload.metadata
-            ):
-                full_content += chunk
-                yield _format_sse("token", {"chunk": chunk})
-            
-            # Record final assistant message
-            assistant_message: ChatMessageModel = ChatMessageModel(role="assistant", content=full_content)
-            SESSION_STORE.append_message(session_id, assistant_message.to_dict())
-            
-            # Yield completion event with the full message object so UI can finalize state
-            # matching the shape expected by non-streaming or agent-streaming completion
-            yield _format_sse("complete", {
-                "session_id": session_id,
-                "message": assistant_message.model_dump()
-            })
+            async with _cancel_on_disconnect(request):
+                async for chunk in _prefetch(astream_chat_response(
+                    user_msg_dict,
+                    metadata=payload.metadata
+                )):
+                    parts.append(chunk)
+                    pending.append(chunk)
+                    pending_chars += len(chunk)
+                    now = loop.time()
+                    if (
+                        SSE_UNBUFFERED_TOKENS
+                        or pending_chars >= SSE_TOKEN_FLUSH_CHARS
+                        or now - last_flush >= SSE_TOKEN_FLUSH_INTERVAL_S
+                    ):
+                        yield _format_sse("token", {"chunk": "".join(pending)})
+                        pending.clear()
+                        pending_chars = 0
+                        last_flush = now
+
+                if pending:
+                    yield _format_sse("token", {"chunk": "".join(pending)})
+
+                full_content = "".join(parts)
+
+                assistant_message: ChatMessageDict = {"role": "assistant", "content": full_content}
+
+                # Yield completion event with the full message object so UI can finalize state
+                # matching the shape expected by non-streaming or agent-streaming completion
+                yield _format_sse("complete", {
+                    "session_id": session_id,
+                    "message": assistant_message,
+                })
+                # Record the assistant message only after the final frame is on the wire.
+                _run_in_background(SESSION_STORE.append_message, session_id, assistant_message)
 
         except Exception as e:
             logger.error(f"Chat stream failed: {e}")
@@ -351,3 +558,17 @@ async def stream_conversation_endpoint(payload: ConversationRequest) -> Streamin
 
 __all__ = ["app"]
 
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop + httptools cut per-write overhead on the SSE endpoints; uvloop is unavailable on Windows.
+    uvicorn.run(
+        app,
+        host=os.environ.get("COUNCIL_HOST", "127.0.0.1"),
+        port=int(os.environ.get("COUNCIL_PORT", "8000")),
+        loop="auto" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        log_level="info",
+    )
+
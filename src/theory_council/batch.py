@@ -0,0 +1,97 @@
+"""
+Gemini Batch API support for latency-tolerant council runs.
+
+Batch jobs cost about half as much as interactive calls but may take minutes to
+complete, so they are only used when a caller opts in (``batch_mode=True``). A job
+that misses its time budget is cancelled and the caller falls back to live calls.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Dict, NamedTuple, Optional
+
+from google import genai
+from google.genai import types
+
+from .gemini_llm import GeminiResponse, usage_from_metadata
+
+logger = logging.getLogger("theory_council.batch")
+
+BATCH_TIMEOUT_S = float(os.environ.get("COUNCIL_BATCH_TIMEOUT_S", "900"))
+BATCH_POLL_INITIAL_S = 2.0
+BATCH_POLL_MAX_S = 30.0
+
+_DONE_STATES = {
+    types.JobState.JOB_STATE_SUCCEEDED,
+    types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED,
+    types.JobState.JOB_STATE_FAILED,
+    types.JobState.JOB_STATE_CANCELLED,
+    types.JobState.JOB_STATE_EXPIRED,
+}
+
+
+class BatchOutcome(NamedTuple):
+    job_name: str
+    responses: Dict[str, GeminiResponse]
+
+
+async def arun_inline_batch(
+    client: genai.Client,
+    model: str,
+    requests: Dict[str, types.InlinedRequest],
+    *,
+    timeout_s: float = BATCH_TIMEOUT_S,
+    display_name: str = "theory-council",
+) -> Optional[BatchOutcome]:
+    """
+    Submit keyed inline requests as one batch job and wait for it with exponential backoff.
+    Returns None when the job fails, times out, or any request has no usable response.
+    """
+    keys = list(requests)
+    try:
+        job = await client.aio.batches.create(
+            model=model,
+            src=[requests[key] for key in keys],
+            config=types.CreateBatchJobConfig(display_name=display_name),
+        )
+    except Exception as e:
+        logger.error("Batch submission failed: %s", e)
+        return None
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_s
+    delay = BATCH_POLL_INITIAL_S
+    try:
+        while job.state not in _DONE_STATES:
+            if loop.time() >= deadline:
+                logger.warning("Batch %s not done after %.0fs; cancelling.", job.name, timeout_s)
+                await client.aio.batches.cancel(name=job.name)
+                return None
+            await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+            delay = min(delay * 2, BATCH_POLL_MAX_S)
+            job = await client.aio.batches.get(name=job.name)
+    except Exception as e:
+        logger.error("Polling batch %s failed: %s", job.name, e)
+        return None
+
+    inlined = (job.dest.inlined_responses if job.dest else None) or []
+    if job.state != types.JobState.JOB_STATE_SUCCEEDED or len(inlined) != len(keys):
+        logger.error("Batch %s ended in %s with %d/%d responses.", job.name, job.state, len(inlined), len(keys))
+        return None
+
+    # Inline responses come back in request order.
+    responses: Dict[str, GeminiResponse] = {}
+    for key, item in zip(keys, inlined):
+        if item.error or item.response is None or not item.response.text:
+            logger.error("Batch %s request %s failed: %s", job.name, key, item.error)
+            return None
+        responses[key] = GeminiResponse(
+            content=item.response.text.strip(),
+            usage=usage_from_metadata(item.response.usage_metadata),
+        )
+    return BatchOutcome(job.name, responses)
+
+
+__all__ = ["BatchOutcome", "arun_inline_batch", "BATCH_TIMEOUT_S"]
@@ -4,13 +4,17 @@ Replaces previous OpenAI-based basic chat to leverage Gemini's long context and
 """
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any, Dict, List, Literal, Optional, TypedDict
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Literal, Optional, TypedDict
 
 from google import genai
 from google.genai import types
 
-from .config import get_google_api_key
+from .chat_cache import get_chat_cache
+from .gemini_llm import get_shared_client
 from .gemini_store import get_or_create_store
 try:
     from langsmith import traceable
@@ -114,31 +118,112 @@ Use simple language by default; define jargon in-place.
 When giving advice, prefer concrete steps and examples over abstract theory summaries.
 """
 
-def _build_gemini_client() -> genai.Client:
-    return genai.Client(api_key=get_google_api_key())
+# Short replies by default: an explicit word budget plus a hard output cap, with thinking off
+# so the cap is spent on visible text.
+CONCISE_CHAT_INSTRUCTION = "\nRespond in ≤120 words unless asked."
+CONCISE_MAX_OUTPUT_TOKENS = 256
+
+# Used whenever File Search cannot be configured; built once rather than per failed turn.
+_FALLBACK_CONFIG = types.GenerateContentConfig(
+    system_instruction=GENERAL_CHAT_SYSTEM_PROMPT,
+    temperature=0.3
+)
+
+
+def _cached_client() -> genai.Client:
+    """Process-wide Gemini client, shared with the council agents so both reuse one HTTP pool."""
+    return get_shared_client()
+
+
+@lru_cache(maxsize=8)
+def _cached_config(target_model: str) -> types.GenerateContentConfig:
+    """File Search config per model. Raises on failure so errors are never cached."""
+    # Find the store we synced to
+    store = get_or_create_store(_cached_client(), display_name="Theory Council Context")
+
+    file_search_tool = types.Tool(
+        file_search=types.FileSearch(
+            file_search_store_names=[store.name]
+        )
+    )
+    return types.GenerateContentConfig(
+        tools=[file_search_tool],
+        system_instruction=GENERAL_CHAT_SYSTEM_PROMPT,
+        temperature=0.3
+    )
+
 
 def _prepare_gemini_config(target_model: str) -> types.GenerateContentConfig:
+    # Set COUNCIL_STORE_REFRESH=1 to re-resolve the store on every turn (e.g. while re-syncing docs).
+    if os.environ.get("COUNCIL_STORE_REFRESH", "").lower() in {"1", "true", "yes"}:
+        _cached_config.cache_clear()
     try:
-        client = _build_gemini_client()
-        # Find the store we synced to
-        store = get_or_create_store(client, display_name="Theory Council Context")
-        
-        file_search_tool = types.Tool(
-            file_search=types.FileSearch(
-                file_search_store_names=[store.name]
-            )
-        )
-        return types.GenerateContentConfig(
-            tools=[file_search_tool],
-            system_instruction=GENERAL_CHAT_SYSTEM_PROMPT,
-            temperature=0.3
-        )
+        return _cached_config(target_model)
     except Exception as e:
         logger.error("Failed to prepare Gemini File Search config: %s", e)
-        return types.GenerateContentConfig(
-            system_instruction=GENERAL_CHAT_SYSTEM_PROMPT,
-            temperature=0.3
+        return _FALLBACK_CONFIG
+
+# Async chat waits this long for the File Search store lookup before answering without it. The
+# server prewarms the config at startup, so normally only a cold lookup (first turn after a failed
+# warm-up, or every turn with COUNCIL_STORE_REFRESH=1) gets near this bound.
+CHAT_CONFIG_TIMEOUT_S = float(os.environ.get("COUNCIL_CHAT_CONFIG_TIMEOUT_S", "10"))
+
+
+async def _aprepare_gemini_config(target_model: str) -> types.GenerateContentConfig:
+    """
+    Resolve the chat config off the event loop, without letting a slow store lookup hold up the first token.
+    """
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(_prepare_gemini_config, target_model), CHAT_CONFIG_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        # The lookup keeps running in its thread and fills the config cache for later turns.
+        logger.warning(
+            "File Search config not ready after %.2fs; answering WITHOUT document grounding.", CHAT_CONFIG_TIMEOUT_S
+        )
+        return _FALLBACK_CONFIG
+
+
+def _apply_concise(config: types.GenerateContentConfig) -> types.GenerateContentConfig:
+    return config.model_copy(
+        update={
+            "system_instruction": GENERAL_CHAT_SYSTEM_PROMPT + CONCISE_CHAT_INSTRUCTION,
+            "max_output_tokens": CONCISE_MAX_OUTPUT_TOKENS,
+            "thinking_config": types.ThinkingConfig(thinking_budget=0),
+        }
+    )
+
+
+def warm_chat_config(target_model: str = DEFAULT_CHAT_MODEL) -> None:
+    """
+    Resolve the File Search store ahead of the first chat turn (called at server startup).
+    """
+    _prepare_gemini_config(target_model)
+
+
+def _cacheable_question(messages: List[ChatMessage]) -> Optional[str]:
+    """
+    Only an opening question is cached; later turns depend on the conversation so far.
+    """
+    turns = [msg for msg in messages if msg["role"] != "system"]
+    if len(turns) == 1 and turns[0]["role"] == "user":
+        return turns[0]["content"].strip() or None
+    return None
+
+
+def _to_gemini_contents(messages: List[ChatMessage]) -> List[types.Content]:
+    """
+    Convert chat messages to Gemini contents; the system prompt travels in the config instead.
+    """
+    contents = [
+        types.Content(
+            role="user" if msg["role"] == "user" else "model",
+            parts=[types.Part(text=msg["content"])],
         )
+        for msg in messages
+        if msg["role"] != "system"
+    ]
+    return contents or [types.Content(role="user", parts=[types.Part(text="Hello")])]
+
 
 @traceable(run_type="llm", name="Gemini Chat (Sync)")
 def generate_chat_response(
@@ -147,34 +232,45 @@ def generate_chat_response(
     model: Optional[str] = None,
     temperature: Optional[float] = None,
     metadata: Optional[Dict[str, Any]] = None,
+    concise: bool = True,
 ) -> ChatResult:
     """
     Generate a response using Google Gemini (Sync).
+    concise=True caps the reply length for quick follow-ups; pass False for long-form answers.
+    On success the assistant reply is appended to ``messages`` in place and the same list is returned.
     """
-    client = _build_gemini_client()
+    client = _cached_client()
     target_model = model or DEFAULT_CHAT_MODEL
-    
-    # Format messages for Gemini
-    gemini_contents = []
-    for msg in messages:
-        if msg["role"] == "system":
-            continue
-        role = "user" if msg["role"] == "user" else "model"
-        gemini_contents.append(types.Content(role=role, parts=[types.Part(text=msg["content"])]))
-        
-    if not gemini_contents:
-        gemini_contents.append(types.Content(role="user", parts=[types.Part(text="Hello")]))
+    gemini_contents = _to_gemini_contents(messages)
+
+    cache = get_chat_cache(client)
+    cache_model = f"{target_model}:concise" if concise else target_model
+    question = _cacheable_question(messages) if cache else None
+    cached, query_vector = cache.match(question, cache_model) if question else (None, None)
+    if cached is not None:
+        messages.append({"role": "assistant", "content": cached})
+        return {
+            "response": cached,
+            "messages": messages,
+            "model": target_model,
+        }
 
+    config = _prepare_gemini_config(target_model)
+    if concise:
+        config = _apply_concise(config)
     try:
         response = client.models.generate_content(
             model=target_model,
             contents=gemini_contents,
-            config=_prepare_gemini_config(target_model)
+            config=config
         )
         content = response.text
+        if query_vector is not None and content:
+            cache.add(query_vector, cache_model, content)
+        messages.append({"role": "assistant", "content": content})
         return {
             "response": content,
-            "messages": [*messages, {"role": "assistant", "content": content}],
+            "messages": messages,
             "model": target_model,
         }
     except Exception as e:
@@ -186,6 +282,98 @@ def generate_chat_response(
         }
 
 
+@traceable(run_type="llm", name="Gemini Chat (Sync Streaming)")
+def stream_chat_response(
+    messages: List[ChatMessage],
+    *,
+    model: Optional[str] = None,
+    temperature: Optional[float] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    concise: bool = True,
+) -> Iterator[str]:
+    """
+    Yield response text chunks from Gemini as they arrive (sync callers such as the CLI).
+    """
+    client = _cached_client()
+    target_model = model or DEFAULT_CHAT_MODEL
+    gemini_contents = _to_gemini_contents(messages)
+
+    config = _prepare_gemini_config(target_model)
+    if concise:
+        config = _apply_concise(config)
+    try:
+        response_stream = client.models.generate_content_stream(
+            model=target_model,
+            contents=gemini_contents,
+            config=config
+        )
+        for chunk in response_stream:
+            if chunk.text:
+                yield chunk.text
+    except Exception as e:
+        logger.error("Gemini streaming failed: %s", e)
+        yield f"[Error: {str(e)}]"
+
+
+@traceable(run_type="llm", name="Gemini Chat (Async)")
+async def agenerate_chat_response(
+    messages: List[ChatMessage],
+    *,
+    model: Optional[str] = None,
+    temperature: Optional[float] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    concise: bool = True,
+) -> ChatResult:
+    """
+    Generate a response using Google Gemini without blocking the event loop.
+    Like generate_chat_response, appends the reply to ``messages`` in place.
+    """
+    client = _cached_client()
+    target_model = model or DEFAULT_CHAT_MODEL
+    # Start resolving the config right away so it overlaps with message prep and the cache lookup.
+    config_task = asyncio.create_task(_aprepare_gemini_config(target_model))
+    gemini_contents = _to_gemini_contents(messages)
+
+    cache = get_chat_cache(client)
+    cache_model = f"{target_model}:concise" if concise else target_model
+    question = _cacheable_question(messages) if cache else None
+    cached, query_vector = await cache.amatch(question, cache_model) if question else (None, None)
+    if cached is not None:
+        config_task.cancel()
+        messages.append({"role": "assistant", "content": cached})
+        return {
+            "response": cached,
+            "messages": messages,
+            "model": target_model,
+        }
+
+    try:
+        config = await config_task
+        if concise:
+            config = _apply_concise(config)
+        response = await client.aio.models.generate_content(
+            model=target_model,
+            contents=gemini_contents,
+            config=config
+        )
+        content = response.text
+        if query_vector is not None and content:
+            cache.add(query_vector, cache_model, content)
+        messages.append({"role": "assistant", "content": content})
+        return {
+            "response": content,
+            "messages": messages,
+            "model": target_model,
+        }
+    except Exception as e:
+        logger.error("Gemini chat failed: %s", e)
+        return {
+            "response": f"Error: {e}",
+            "messages": messages,
+            "model": target_model
+        }
+
+
 @traceable(run_type="llm", name="Gemini Chat (Streaming)")
 async def astream_chat_response(
     messages: List[ChatMessage],
@@ -193,36 +381,45 @@ async def astream_chat_response(
     model: Optional[str] = None,
     temperature: Optional[float] = None,
     metadata: Optional[Dict[str, Any]] = None,
+    concise: bool = True,
 ):
     """
     Async generator for streaming responses from Gemini.
     """
-    client = _build_gemini_client()
+    client = _cached_client()
     target_model = model or DEFAULT_CHAT_MODEL
-    
-    gemini_contents = []
-    for msg in messages:
-        if msg["role"] == "system":
-            continue
-        role = "user" if msg["role"] == "user" else "model"
-        gemini_contents.append(types.Content(role=role, parts=[types.Part(text=msg["content"])]))
+    config_task = asyncio.create_task(_aprepare_gemini_config(target_model))
+    gemini_contents = _to_gemini_contents(messages)
 
-    if not gemini_contents:
-        gemini_contents.append(types.Content(role="user", parts=[types.Part(text="Hello")]))
+    cache = get_chat_cache(client)
+    cache_model = f"{target_model}:concise" if concise else target_model
+    question = _cacheable_question(messages) if cache else None
+    cached, query_vector = await cache.amatch(question, cache_model) if question else (None, None)
+    if cached is not None:
+        config_task.cancel()
+        yield cached
+        return
 
     try:
-        # Use simple iteration over the stream
-        config = _prepare_gemini_config(target_model)
-        response_stream = client.models.generate_content_stream(
+        config = await config_task
+        if concise:
+            config = _apply_concise(config)
+        # The aio surface yields chunks without blocking the event loop between tokens.
+        response_stream = await client.aio.models.generate_content_stream(
             model=target_model,
             contents=gemini_contents,
             config=config
         )
-        
-        for chunk in response_stream:
+
+        parts: List[str] = []
+        async for chunk in response_stream:
             if chunk.text:
+                parts.append(chunk.text)
                 yield chunk.text
-                
+
+        if query_vector is not None and parts:
+            cache.add(query_vector, cache_model, "".join(parts))
+
     except Exception as e:
         logger.error("Gemini streaming failed: %s", e)
         yield f"[Error: {str(e)}]"
@@ -232,6 +429,9 @@ __all__ = [
     "ChatMessage", 
     "ChatResult", 
     "generate_chat_response", 
+    "agenerate_chat_response",
+    "stream_chat_response",
+    "warm_chat_config",
     "astream_chat_response", 
     "GENERAL_CHAT_SYSTEM_PROMPT"
 ]
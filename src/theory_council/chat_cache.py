@@ -0,0 +1,83 @@
+"""
+Opt-in semantic cache for first-turn chat questions.
+
+Near-duplicate openers ("What is SCT?" / "Explain social cognitive theory") are answered
+from a small in-process index of normalized query embeddings instead of a fresh Gemini call.
+Only single-question conversations are cached, since later turns depend on the history.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+from google import genai
+
+from .similarity_cache import SimilarityCache, normalize_vector
+
+logger = logging.getLogger("theory_council.chat_cache")
+
+EMBEDDING_MODEL = "text-embedding-004"
+# Short acronym questions ("What is SCT?" / "What is SDT?") embed close together, so the bar is high.
+DEFAULT_SIMILARITY_THRESHOLD = 0.97
+DEFAULT_MAX_ENTRIES = 512
+
+
+class SemanticChatCache(SimilarityCache[str, str]):
+    """
+    Bounded cosine-similarity cache of (query embedding, model) -> response text.
+    """
+
+    def __init__(
+        self,
+        client: genai.Client,
+        *,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        super().__init__(threshold, max_entries)
+        self._client = client
+
+    def embed(self, text: str) -> np.ndarray:
+        result = self._client.models.embed_content(model=EMBEDDING_MODEL, contents=text)
+        return normalize_vector(result.embeddings[0].values)
+
+    async def aembed(self, text: str) -> np.ndarray:
+        result = await self._client.aio.models.embed_content(model=EMBEDDING_MODEL, contents=text)
+        return normalize_vector(result.embeddings[0].values)
+
+    def match(self, text: str, model: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Return (cached response or None, query embedding); embedding failures disable the lookup.
+        """
+        try:
+            vector = self.embed(text)
+        except Exception as e:
+            logger.warning("Chat cache embedding failed: %s", e)
+            return None, None
+        return self.lookup(vector, model), vector
+
+    async def amatch(self, text: str, model: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        try:
+            vector = await self.aembed(text)
+        except Exception as e:
+            logger.warning("Chat cache embedding failed: %s", e)
+            return None, None
+        return self.lookup(vector, model), vector
+
+
+@lru_cache(maxsize=1)
+def get_chat_cache(client: genai.Client) -> Optional[SemanticChatCache]:
+    """
+    Return the process-wide cache when COUNCIL_CHAT_CACHE is enabled, else None.
+    """
+    if os.environ.get("COUNCIL_CHAT_CACHE", "").lower() not in {"1", "true", "yes"}:
+        return None
+    threshold = float(os.environ.get("COUNCIL_CHAT_CACHE_THRESHOLD", DEFAULT_SIMILARITY_THRESHOLD))
+    logger.info("Semantic chat cache enabled (threshold %.2f).", threshold)
+    return SemanticChatCache(client, threshold=threshold)
+
+
+__all__ = ["SemanticChatCache", "get_chat_cache"]
@@ -3,10 +3,11 @@ Command-line interface for running the Theory Council workflow.
 """
 from __future__ import annotations
 
-from typing import Optional
+from typing import List, Optional
 
 import typer
 
+from .chat import ChatMessage, stream_chat_response
 from .graph import CouncilPipelineResult, run_council_pipeline
 
 cli = typer.Typer(help="Run the Theory Council LangGraph workflow from the terminal.")
@@ -21,17 +22,38 @@ def _prompt_for_problem() -> str:
 
 
 @cli.command()
-def run(problem: Optional[str] = typer.Option(None, "--problem", "-p", help="Problem description text.")) -> None:
+def run(
+    problem: Optional[str] = typer.Option(None, "--problem", "-p", help="Problem description text."),
+    batch: bool = typer.Option(False, "--batch", help="Run the theory agents through the Gemini Batch API (cheaper, slower)."),
+) -> None:
     """
     Run the Theory Council workflow for the provided behavior-change problem.
     """
     text = problem or _prompt_for_problem()
-    result: CouncilPipelineResult = run_council_pipeline(text)
+    result: CouncilPipelineResult = run_council_pipeline(text, batch_mode=batch or None)
     final_text = result.get("final_synthesis") or "(no output produced)"
     typer.echo("=== Theory Council Output ===")
     typer.echo(final_text)
 
 
+@cli.command()
+def chat(message: Optional[str] = typer.Option(None, "--message", "-m", help="Opening message.")) -> None:
+    """
+    Chat with the theory assistant, printing the reply as it streams. Submit an empty line to exit.
+    """
+    history: List[ChatMessage] = []
+    text = message or typer.prompt("You", default="", show_default=False)
+    while text.strip():
+        history.append({"role": "user", "content": text})
+        parts: List[str] = []
+        for chunk in stream_chat_response(history):
+            parts.append(chunk)
+            typer.echo(chunk, nl=False)
+        typer.echo()
+        history.append({"role": "assistant", "content": "".join(parts)})
+        text = typer.prompt("You", default="", show_default=False)
+
+
 def main() -> None:
     cli()
 
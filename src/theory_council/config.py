@@ -4,24 +4,40 @@ Environment loading and LLM helpers for the Theory Council project.
 from __future__ import annotations
 
 import os
+from functools import lru_cache
 from typing import Dict, Optional
 
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
-# Allow project-local .env values to override inherited environment entries
-load_dotenv(override=True)
+
+@lru_cache(maxsize=1)
+def _ensure_env_loaded() -> None:
+    """
+    Load the project .env once per process; later calls are no-ops.
+    """
+    # Allow project-local .env values to override inherited environment entries
+    load_dotenv(override=True)
+
+
+# Module-level knobs here and in the modules importing config are read at import time,
+# so .env has to be applied before them.
+_ensure_env_loaded()
 
 DEFAULT_MODEL = "gpt-4o"
 DEFAULT_TEMPERATURE = 0.35
 INTEGRATOR_MODEL = os.environ.get("INTEGRATOR_MODEL", "gpt-4.1")
 INTEGRATOR_TEMPERATURE = 0.4
+# Cheap model for the optional theory router (COUNCIL_THEORY_ROUTER=1).
+THEORY_ROUTER_MODEL = os.environ.get("THEORY_ROUTER_MODEL", "gemini-2.5-flash-lite")
+THEORY_ROUTER_TOP_K = int(os.environ.get("THEORY_ROUTER_TOP_K", "3"))
 
 
 def _require_openai_key() -> str:
     """
     Ensure that OPENAI_API_KEY is available and return it.
     """
+    _ensure_env_loaded()
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not set. Please configure it in your environment or .env file.")
@@ -32,6 +48,7 @@ def get_google_api_key() -> str:
     """
     Ensure that GOOGLE_API_KEY is available and return it.
     """
+    _ensure_env_loaded()
     api_key = os.environ.get("GOOGLE_API_KEY")
     if not api_key:
         raise RuntimeError("GOOGLE_API_KEY is not set. Please configure it in your environment or .env file.")
@@ -40,8 +57,14 @@ def get_google_api_key() -> str:
 
 def get_llm(model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE) -> ChatOpenAI:
     """
-    Build a ChatOpenAI instance with the provided parameters.
+    Return a shared ChatOpenAI instance for the provided parameters.
     """
+    return _cached_llm(model, temperature)
+
+
+@lru_cache(maxsize=16)
+def _cached_llm(model: str, temperature: float) -> ChatOpenAI:
+    # One instance per (model, temperature) keeps its HTTP connection pool warm across calls.
     api_key = _require_openai_key()
     return ChatOpenAI(model=model, temperature=temperature, api_key=api_key)
 
@@ -61,6 +84,7 @@ def get_langsmith_settings() -> Dict[str, Optional[str]]:
     """
     Surface optional LangSmith-related environment variables for observability tooling.
     """
+    _ensure_env_loaded()
     return {
         "LANGCHAIN_TRACING_V2": os.environ.get("LANGCHAIN_TRACING_V2"),
         "LANGCHAIN_API_KEY": os.environ.get("LANGCHAIN_API_KEY"),
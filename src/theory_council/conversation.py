@@ -4,11 +4,12 @@ multi-agent Theory Council workflow.
 """
 from __future__ import annotations
 
+import asyncio
 from typing import Any, Dict, List, Literal, Optional, TypedDict
 
-from .chat import ChatMessage, generate_chat_response
-from .graph import CouncilPipelineResult, run_council_pipeline
-from .orchestration import InMemorySessionStore
+from .chat import ChatMessage, ChatResult, agenerate_chat_response, generate_chat_response
+from .graph import CouncilPipelineResult, arun_council_pipeline, run_council_pipeline
+from .orchestration import SessionBackend
 
 ConversationMode = Literal["chat", "agent"]
 
@@ -35,7 +36,7 @@ def _latest_user_utterance(messages: List[ChatMessage]) -> Optional[str]:
 
 def process_conversation_turn(
     *,
-    session_store: InMemorySessionStore,
+    session_store: SessionBackend,
     session_id: str,
     messages: List[ChatMessage],
     agent_enabled: bool,
@@ -46,40 +47,87 @@ def process_conversation_turn(
     the full multi-agent Theory Council workflow.
     """
 
-    session_store.replace_messages(session_id, messages)
-
     if not agent_enabled:
         chat_result = generate_chat_response(messages, metadata=metadata)
-        assistant_message = chat_result["messages"][-1]
-        session_store.replace_messages(session_id, chat_result["messages"])
-        return {
-            "mode": "chat",
-            "session_id": session_id,
-            "messages": chat_result["messages"],
-            "assistant_message": assistant_message,
-            "auto_disable_agent": False,
-        }
+        outcome = _chat_outcome(session_id, chat_result)
+    else:
+        problem_statement = _require_problem_statement(messages)
+        agent_result = run_council_pipeline(problem_statement, metadata=metadata)
+        outcome = _agent_outcome(session_id, messages, agent_result)
+    # One session write per turn, once the reply is known.
+    session_store.replace_messages(session_id, outcome["messages"])
+    return outcome
+
+
+async def aprocess_conversation_turn(
+    *,
+    session_store: SessionBackend,
+    session_id: str,
+    messages: List[ChatMessage],
+    agent_enabled: bool,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> ConversationOutcome:
+    """
+    Async variant of process_conversation_turn; LLM waits stay on the event loop.
+    """
 
+    if not agent_enabled:
+        chat_result = await agenerate_chat_response(messages, metadata=metadata)
+        outcome = _chat_outcome(session_id, chat_result)
+    else:
+        problem_statement = _require_problem_statement(messages)
+        agent_result = await arun_council_pipeline(problem_statement, metadata=metadata)
+        outcome = _agent_outcome(session_id, messages, agent_result)
+    # Store calls are blocking (a network round trip with Redis), so they run off the event loop.
+    await asyncio.to_thread(session_store.replace_messages, session_id, outcome["messages"])
+    return outcome
+
+
+def _require_problem_statement(messages: List[ChatMessage]) -> str:
     problem_statement = _latest_user_utterance(messages)
     if not problem_statement:
         raise ValueError("Agent mode requires a user problem statement.")
+    return problem_statement
+
 
-    agent_result = run_council_pipeline(problem_statement, metadata=metadata)
+def _chat_outcome(session_id: str, chat_result: ChatResult) -> ConversationOutcome:
+    assistant_message = chat_result["messages"][-1]
+    return {
+        "mode": "chat",
+        "session_id": session_id,
+        "messages": chat_result["messages"],
+        "assistant_message": assistant_message,
+        "auto_disable_agent": False,
+    }
+
+
+def _agent_outcome(
+    session_id: str,
+    messages: List[ChatMessage],
+    agent_result: CouncilPipelineResult,
+) -> ConversationOutcome:
     assistant_message: ChatMessage = {
         "role": "assistant",
         "content": agent_result["final_synthesis"],
     }
-    session_store.append_message(session_id, assistant_message)
+    # The request's message list is extended in place rather than copied each turn.
+    history = messages
+    history.append(assistant_message)
 
     return {
         "mode": "agent",
         "session_id": session_id,
-        "messages": session_store.get_or_create(session_id)["messages"],
+        "messages": history,
         "assistant_message": assistant_message,
         "agent_result": agent_result,
         "auto_disable_agent": True,
     }
 
 
-__all__ = ["process_conversation_turn", "ConversationMode", "ConversationOutcome"]
+__all__ = [
+    "process_conversation_turn",
+    "aprocess_conversation_turn",
+    "ConversationMode",
+    "ConversationOutcome",
+]
 
@@ -2,8 +2,16 @@
 Gemini Adapter for LangChain-style invocation.
 Allows substituting ChatOpenAI with Google Gemini in the Theory Council graph.
 """
+import atexit
+import hashlib
+import importlib.util
 import logging
-from typing import Any, Dict, List, Optional
+import os
+import threading
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import httpx
+from cachetools import TTLCache
 from google import genai
 from google.genai import types
 
@@ -11,12 +19,76 @@ from .config import get_google_api_key
 
 logger = logging.getLogger("theory_council.gemini_llm")
 
+# Failed calls return this prefix as content rather than raising, so callers can keep going.
+ERROR_RESPONSE_PREFIX = "Error generating response: "
+
+# Sync calls share one httpx pool sized for the parallel council burst; with the optional
+# h2 package installed they multiplex over a single HTTP/2 connection.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+HTTP_MAX_CONNECTIONS = 64
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+
+# Opt-in explicit context caching of the static agent system prompts (COUNCIL_GEMINI_PROMPT_CACHE=1).
+# Gemini rejects caches under ~1024 tokens, so shorter prompts keep relying on implicit prefix caching.
+PROMPT_CACHE_TTL_SECONDS = 3600
+PROMPT_CACHE_MIN_CHARS = 4000
+# Handles are dropped a few minutes before the server-side cache expires.
+_PROMPT_CACHES: TTLCache = TTLCache(maxsize=64, ttl=PROMPT_CACHE_TTL_SECONDS - 300)
+_PROMPT_CACHES_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_shared_client() -> genai.Client:
+    """
+    Process-wide Gemini client so every agent call reuses one HTTP connection pool.
+    Async calls go through the SDK's per-event-loop aiohttp session, which keeps connections alive too.
+    """
+    http_options = types.HttpOptions(
+        client_args={
+            "http2": HTTP2_AVAILABLE,
+            "limits": httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        }
+    )
+    return genai.Client(api_key=get_google_api_key(), http_options=http_options)
+
+
+@atexit.register
+def _close_shared_client() -> None:
+    # Only close a client that was actually built; creating one here would need an API key.
+    if get_shared_client.cache_info().currsize:
+        get_shared_client().close()
+
+
+def _prompt_cache_enabled() -> bool:
+    return os.environ.get("COUNCIL_GEMINI_PROMPT_CACHE", "").lower() in {"1", "true", "yes"}
+
+
+def usage_from_metadata(usage_metadata: Any) -> Optional[Dict[str, int]]:
+    """
+    Flatten Gemini usage metadata; cached_tokens counts prompt tokens served from the prefix cache.
+    """
+    if usage_metadata is None:
+        return None
+    fields = {
+        "prompt_tokens": usage_metadata.prompt_token_count,
+        "cached_tokens": usage_metadata.cached_content_token_count,
+        "output_tokens": usage_metadata.candidates_token_count,
+    }
+    return {key: value for key, value in fields.items() if value is not None}
+
+
 class GeminiResponse:
     """
     Duck-typed response object compatible with LangChain's AIMessage.
     """
-    def __init__(self, content: str):
+    def __init__(self, content: str, usage: Optional[Dict[str, int]] = None, error: bool = False):
         self.content = content
+        self.usage = usage
+        # Set on the failure response/chunk, whose content starts with ERROR_RESPONSE_PREFIX.
+        self.error = error
 
 class GeminiLCWrapper:
     """
@@ -26,7 +98,9 @@ class GeminiLCWrapper:
         self.model = model
         self.store_name = store_name
         self.temperature = temperature
-        self.client = genai.Client(api_key=get_google_api_key())
+        self.client = get_shared_client()
+        # model/store/temperature are fixed per wrapper, so the config is built once.
+        self._base_config = self._prepare_config()
 
     def _prepare_config(self) -> types.GenerateContentConfig:
         tools = []
@@ -46,9 +120,10 @@ class GeminiLCWrapper:
             # but the graph passes it as the first message.
         )
 
-    def invoke(self, messages: List[Dict[str, str]]) -> GeminiResponse:
+    def _build_request(
+        self, messages: List[Dict[str, str]]
+    ) -> Tuple[List[types.Content], types.GenerateContentConfig]:
         """
-        Mimics langchain_openai.ChatOpenAI.invoke
         messages: List of {"role": "system"|"user"|"assistant", "content": str}
         """
         gemini_contents = []
@@ -75,17 +150,147 @@ class GeminiLCWrapper:
         if not gemini_contents:
             gemini_contents.append(types.Content(role="user", parts=[types.Part(text="Hello")]))
 
-        config = self._prepare_config()
+        config = self._base_config
         if system_instruction:
-            config.system_instruction = system_instruction
+            config = config.model_copy(update={"system_instruction": system_instruction})
+        return gemini_contents, config
+
+    def _prompt_cache_key(self, config: types.GenerateContentConfig) -> Optional[Tuple[str, Optional[str], str]]:
+        system_instruction = config.system_instruction
+        if not _prompt_cache_enabled() or not isinstance(system_instruction, str):
+            return None
+        if len(system_instruction) < PROMPT_CACHE_MIN_CHARS:
+            return None
+        digest = hashlib.sha1(system_instruction.encode("utf-8")).hexdigest()
+        return (self.model, self.store_name, digest)
+
+    def _cache_config(self, config: types.GenerateContentConfig) -> types.CreateCachedContentConfig:
+        return types.CreateCachedContentConfig(
+            system_instruction=config.system_instruction,
+            tools=config.tools or None,
+            ttl=f"{PROMPT_CACHE_TTL_SECONDS}s",
+        )
+
+    @staticmethod
+    def _use_cached_prompt(config: types.GenerateContentConfig, cache_name: Optional[str]) -> types.GenerateContentConfig:
+        if not cache_name:
+            return config
+        # The cached content carries the system instruction and File Search tool, so the request must not repeat them.
+        return config.model_copy(update={"cached_content": cache_name, "system_instruction": None, "tools": None})
+
+    def _with_prompt_cache(self, config: types.GenerateContentConfig) -> types.GenerateContentConfig:
+        """
+        Swap the system instruction for an explicit Gemini context cache, creating it on first use.
+        """
+        key = self._prompt_cache_key(config)
+        if key is None:
+            return config
+        with _PROMPT_CACHES_LOCK:
+            if key in _PROMPT_CACHES:
+                return self._use_cached_prompt(config, _PROMPT_CACHES[key])
+        try:
+            cache_name = self.client.caches.create(model=self.model, config=self._cache_config(config)).name
+        except Exception as e:
+            # Remember the failure (e.g. prompt below the model's minimum) so every call doesn't retry it.
+            logger.warning("Gemini prompt cache creation failed: %s", e)
+            cache_name = None
+        with _PROMPT_CACHES_LOCK:
+            _PROMPT_CACHES[key] = cache_name
+        return self._use_cached_prompt(config, cache_name)
+
+    async def _awith_prompt_cache(self, config: types.GenerateContentConfig) -> types.GenerateContentConfig:
+        key = self._prompt_cache_key(config)
+        if key is None:
+            return config
+        with _PROMPT_CACHES_LOCK:
+            if key in _PROMPT_CACHES:
+                return self._use_cached_prompt(config, _PROMPT_CACHES[key])
+        try:
+            cache = await self.client.aio.caches.create(model=self.model, config=self._cache_config(config))
+            cache_name = cache.name
+        except Exception as e:
+            logger.warning("Gemini prompt cache creation failed: %s", e)
+            cache_name = None
+        with _PROMPT_CACHES_LOCK:
+            _PROMPT_CACHES[key] = cache_name
+        return self._use_cached_prompt(config, cache_name)
+
+    def batch_request(self, messages: List[Dict[str, str]]) -> types.InlinedRequest:
+        """
+        The same call as invoke(), packaged as an inline Batch API request.
+        """
+        gemini_contents, config = self._build_request(messages)
+        return types.InlinedRequest(model=self.model, contents=gemini_contents, config=config)
 
+    def invoke(self, messages: List[Dict[str, str]]) -> GeminiResponse:
+        """
+        Mimics langchain_openai.ChatOpenAI.invoke
+        """
+        gemini_contents, config = self._build_request(messages)
+        config = self._with_prompt_cache(config)
         try:
             response = self.client.models.generate_content(
                 model=self.model,
                 contents=gemini_contents,
                 config=config
             )
-            return GeminiResponse(content=response.text)
+            return GeminiResponse(content=response.text, usage=usage_from_metadata(response.usage_metadata))
+        except Exception as e:
+            logger.error("Gemini invocation failed: %s", e)
+            return GeminiResponse(content=f"{ERROR_RESPONSE_PREFIX}{e}", error=True)
+
+    def stream(self, messages: List[Dict[str, str]]) -> Iterator[GeminiResponse]:
+        """
+        Mimics langchain_openai.ChatOpenAI.stream, yielding text chunks as they arrive.
+        """
+        gemini_contents, config = self._build_request(messages)
+        config = self._with_prompt_cache(config)
+        try:
+            for chunk in self.client.models.generate_content_stream(
+                model=self.model,
+                contents=gemini_contents,
+                config=config
+            ):
+                # The final chunk may carry only usage metadata.
+                if chunk.text or chunk.usage_metadata:
+                    yield GeminiResponse(content=chunk.text or "", usage=usage_from_metadata(chunk.usage_metadata))
+        except Exception as e:
+            logger.error("Gemini streaming failed: %s", e)
+            yield GeminiResponse(content=f"{ERROR_RESPONSE_PREFIX}{e}", error=True)
+
+    async def ainvoke(self, messages: List[Dict[str, str]]) -> GeminiResponse:
+        """
+        Mimics langchain_openai.ChatOpenAI.ainvoke
+        """
+        gemini_contents, config = self._build_request(messages)
+        config = await self._awith_prompt_cache(config)
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=gemini_contents,
+                config=config
+            )
+            return GeminiResponse(content=response.text, usage=usage_from_metadata(response.usage_metadata))
         except Exception as e:
             logger.error("Gemini invocation failed: %s", e)
-            return GeminiResponse(content=f"Error generating response: {e}")
+            return GeminiResponse(content=f"{ERROR_RESPONSE_PREFIX}{e}", error=True)
+
+    async def astream(self, messages: List[Dict[str, str]]) -> AsyncIterator[GeminiResponse]:
+        """
+        Mimics langchain_openai.ChatOpenAI.astream
+        """
+        gemini_contents, config = self._build_request(messages)
+        config = await self._awith_prompt_cache(config)
+        try:
+            stream = await self.client.aio.models.generate_content_stream(
+                model=self.model,
+                contents=gemini_contents,
+                config=config
+            )
+            async for chunk in stream:
+                # The final chunk may carry only usage metadata.
+                if chunk.text or chunk.usage_metadata:
+                    yield GeminiResponse(content=chunk.text or "", usage=usage_from_metadata(chunk.usage_metadata))
+        except Exception as e:
+            logger.error("Gemini streaming failed: %s", e)
+            yield GeminiResponse(content=f"{ERROR_RESPONSE_PREFIX}{e}", error=True)
@@ -2,25 +2,60 @@
 Gemini File Search Store Manager.
 Handles syncing local context files to a managed Gemini File Search Store.
 """
+import hashlib
 import logging
 import os
 import glob
 import time
-from typing import Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
 
+import orjson
 from google import genai
 from google.genai import types
 
-from .config import get_google_api_key
+from .gemini_llm import get_shared_client
 
 logger = logging.getLogger("theory_council.gemini_store")
 
+# Uploads/imports are network-bound, so several files are pushed at once.
+SYNC_MAX_WORKERS = 8
+# Import polls back off exponentially: 0.5s, 1s, 2s, ... capped at 8s.
+SYNC_POLL_INITIAL_S = 0.5
+SYNC_POLL_MAX_S = 8.0
+
+# Records which PDF contents (by sha256) were already imported into which store.
+MANIFEST_PATH = os.path.join(os.path.expanduser("~"), ".cache", "theory_council", "gemini_manifest.json")
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as handle:
+        return hashlib.file_digest(handle, "sha256").hexdigest()
+
+
+def _load_manifest() -> Dict[str, Dict[str, str]]:
+    """
+    Load {store_name: {sha256: gemini_file_name}}; a missing or corrupt manifest means "sync everything".
+    """
+    try:
+        with open(MANIFEST_PATH, "rb") as handle:
+            return orjson.loads(handle.read())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+
+def _save_manifest(manifest: Dict[str, Dict[str, str]]) -> None:
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_path, MANIFEST_PATH)
+
 def get_gemini_client() -> genai.Client:
     """
-    Construct a Gemini Client using the project configuration.
+    Return the process-wide Gemini client (shared with the agents and chat helper).
     """
-    api_key = get_google_api_key()
-    return genai.Client(api_key=api_key)
+    return get_shared_client()
 
 def get_or_create_store(client: genai.Client, display_name: str) -> types.FileSearchStore:
     """
@@ -61,30 +96,54 @@ def sync_context_files(source_dir: str, display_name: str) -> Optional[str]:
             logger.info("No PDFs found in %s to sync.", source_dir)
             return store.name
             
-        logger.info("Syncing %d PDFs from '%s' to store '%s'...", len(pdf_files), source_dir, display_name)
-        
+        manifest = _load_manifest()
+        synced = manifest.setdefault(store.name, {})
+        to_sync: Dict[str, str] = {}
         for file_path in pdf_files:
+            digest = _file_sha256(file_path)
+            if digest not in synced:
+                to_sync.setdefault(digest, file_path)
+        if not to_sync:
+            logger.info("All %d PDFs in '%s' are already synced.", len(pdf_files), display_name)
+            return store.name
+
+        logger.info(
+            "Syncing %d new/changed PDFs (of %d) from '%s' to store '%s'...",
+            len(to_sync), len(pdf_files), source_dir, display_name,
+        )
+
+        def upload_and_import(item: Tuple[str, str]) -> Tuple[str, str, types.ImportFileOperation]:
+            digest, file_path = item
             filename = os.path.basename(file_path)
-            # Simplistic check: just upload. In prod, check if hash exists or similar.
-            # logger.info("Processing %s...", filename)
-            
-            # 1. Upload File
             uploaded_file = client.files.upload(file=file_path, config={'display_name': filename})
-            # logger.info("Uploaded file resource: %s", uploaded_file.name)
-            
-            # 2. Import into Store
             operation = client.file_search_stores.import_file(
                 file_search_store_name=store.name,
                 file_name=uploaded_file.name
             )
-            
-            # Debug print
-            # logger.info("Operation type: %s", type(operation))
-            while not operation.done:
-                time.sleep(2)
-                # logger.info("Refreshing operation: %s", operation.name)
-                # Pass the operation object itself if the SDK expects an object with .name
-                operation = client.operations.get(operation)
+            return digest, uploaded_file.name, operation
+
+        # Submit every upload + import up front, then wait on all operations together.
+        with ThreadPoolExecutor(max_workers=min(SYNC_MAX_WORKERS, len(to_sync))) as pool:
+            pending: List[Tuple[str, str, types.ImportFileOperation]] = list(
+                pool.map(upload_and_import, to_sync.items())
+            )
+
+            def refresh(entry: Tuple[str, str, types.ImportFileOperation]) -> Tuple[str, str, types.ImportFileOperation]:
+                digest, file_name, operation = entry
+                # Pass the operation object itself; the SDK refreshes it by .name
+                return digest, file_name, client.operations.get(operation)
+
+            delay = SYNC_POLL_INITIAL_S
+            while pending:
+                for digest, file_name, operation in pending:
+                    if operation.done and not operation.error:
+                        synced[digest] = file_name
+                pending = [entry for entry in pending if not entry[2].done]
+                if pending:
+                    time.sleep(delay)
+                    delay = min(delay * 2, SYNC_POLL_MAX_S)
+                    pending = list(pool.map(refresh, pending))
+        _save_manifest(manifest)
 
         logger.info("Sync complete for store: %s", display_name)
         return store.name
@@ -94,6 +153,16 @@ def sync_context_files(source_dir: str, display_name: str) -> Optional[str]:
         return None
 
 
+# Map context subdirectory -> (Theory Key, Display Name)
+THEORY_CONTEXT_DIRS: Dict[str, Tuple[str, str]] = {
+    "Intervention Mapping": ("im_anchor", "Theory Council - IM"),
+    "Social Cognitive Theory": ("sct", "Theory Council - SCT"),
+    "Self Determination Theory": ("sdt", "Theory Council - SDT"),
+    "Wise Intervention": ("wise", "Theory Council - Wise"),
+    "Theory of Planned Behavior": ("ra", "Theory Council - RA"),
+    "Ecological Theories & Implementation Science": ("env_impl", "Theory Council - EnvImpl"),
+}
+
 # Global cache of theory key -> store name
 _THEORY_STORE_MAPPING: Dict[str, str] = {}
 
@@ -105,18 +174,8 @@ def sync_all_theory_stores(base_context_dir: str) -> Dict[str, str]:
     Syncs the 5 theory folders + generic context to their respective stores.
     Returns a dict mapping {theory_key: store_name}.
     """
-    # Map subdirectory -> (Theory Key, Display Name)
-    mapping = {
-        "Intervention Mapping": ("im_anchor", "Theory Council - IM"),
-        "Social Cognitive Theory": ("sct", "Theory Council - SCT"),
-        "Self Determination Theory": ("sdt", "Theory Council - SDT"),
-        "Wise Intervention": ("wise", "Theory Council - Wise"),
-        "Theory of Planned Behavior": ("ra", "Theory Council - RA"),
-        "Ecological Theories & Implementation Science": ("env_impl", "Theory Council - EnvImpl"),
-    }
-    
     results = {}
-    for sub, (key, name) in mapping.items():
+    for sub, (key, name) in THEORY_CONTEXT_DIRS.items():
         dir_path = os.path.join(base_context_dir, sub)
         store_name = sync_context_files(dir_path, name)
         if store_name:
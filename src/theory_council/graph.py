@@ -3,14 +3,24 @@ LangGraph state and node definitions for the Theory Council workflow.
 """
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, TypedDict, Iterator
-
+import asyncio
+import logging
+import operator
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from time import perf_counter_ns
+from typing import Annotated, Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, TypedDict, Iterator
+
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, StateGraph
 
-from .config import get_integrator_llm, get_llm
-from .gemini_llm import GeminiLCWrapper
+from .config import THEORY_ROUTER_MODEL, THEORY_ROUTER_TOP_K
+from .batch import arun_inline_batch
+from .gemini_llm import ERROR_RESPONSE_PREFIX, GeminiLCWrapper, GeminiResponse, get_shared_client
 from .gemini_store import get_theory_store_name
+from .llm_cache import CachedLLM, get_response_cache
 from .personas import (
     DEBATE_MODERATOR_SYSTEM_PROMPT,
     ENV_IMPL_AGENT_SYSTEM_PROMPT,
@@ -20,10 +30,17 @@ from .personas import (
     RA_AGENT_SYSTEM_PROMPT,
     SCT_AGENT_SYSTEM_PROMPT,
     SDT_AGENT_SYSTEM_PROMPT,
+    THEORY_ROUTER_SYSTEM_PROMPT,
     THEORY_SELECTOR_SYSTEM_PROMPT,
     WISE_AGENT_SYSTEM_PROMPT,
 )
 
+logger = logging.getLogger("theory_council.graph")
+
+# The integrator runs only when at least this many theories (or all selected ones) produced output.
+INTEGRATOR_MIN_THEORY_OUTPUTS = 2
+SKIPPED_SYNTHESIS = "[skipped: insufficient theory outputs]"
+
 THEORY_LABELS = [
     ("sct", "SCT (Social Cognitive Theory)"),
     ("sdt", "SDT (Self-Determination Theory)"),
@@ -31,6 +48,7 @@ THEORY_LABELS = [
     ("ra", "Reasoned Action / Decision"),
     ("env_impl", "Environment and Implementation"),
 ]
+_THEORY_LABEL_MAP: Dict[str, str] = dict(THEORY_LABELS)
 
 
 class AgentTrace(TypedDict, total=False):
@@ -45,22 +63,33 @@ class AgentTrace(TypedDict, total=False):
     completed_at: str
     duration_ms: float
     metadata: Dict[str, Any]
+    usage: Dict[str, int]
+
+
+def _merge_theory_outputs(left: Dict[str, str], right: Dict[str, str]) -> Dict[str, str]:
+    return {**left, **right}
 
 
 class CouncilState(TypedDict):
     """
     The shared state passed between Theory Council agents.
+
+    Nodes return only the keys they change. The theory agents run in parallel, so
+    ``agent_traces`` and ``theory_outputs`` use reducers to merge their updates.
     """
 
     raw_problem: str
     framed_problem: Optional[str]
     im_summary: Optional[str]
-    theory_outputs: Dict[str, str]
+    theory_outputs: Annotated[Dict[str, str], _merge_theory_outputs]
+    theory_user_message: Optional[Dict[str, str]]
+    theories_text: Optional[str]
     debate_summary: Optional[str]
     theory_ranking: Optional[str]
     final_synthesis: Optional[str]
-    agent_traces: List[AgentTrace]
+    agent_traces: Annotated[List[AgentTrace], operator.add]
     chat_history: List[Dict[str, str]]
+    selected_theories: List[str]
 
 
 class CouncilPipelineResult(TypedDict):
@@ -87,45 +116,49 @@ SECTION_HEADERS = [
 ]
 
 
-def _now() -> datetime:
-    return datetime.now(timezone.utc)
+class _Stamp(NamedTuple):
+    wall: datetime
+    ns: int
+
+
+def _now() -> _Stamp:
+    """
+    Start-of-node timestamp: one wall-clock read for the ISO stamp, a monotonic one for the duration.
+    """
+    return _Stamp(datetime.now(timezone.utc), perf_counter_ns())
 
 
 def _record_agent_progress(
-    state: CouncilState,
     *,
     agent_key: str,
     agent_label: str,
     content: str,
-    started_at: datetime,
-    completed_at: datetime,
+    started_at: _Stamp,
+    completed_at: int,
     metadata: Optional[Dict[str, Any]] = None,
     updates: Optional[Dict[str, Any]] = None,
-) -> CouncilState:
+    usage: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    # completed_at is a perf_counter_ns() reading; its wall time is derived from the start stamp.
+    elapsed_ns = max(completed_at - started_at.ns, 0)
     trace: AgentTrace = {
         "agent_key": agent_key,
         "agent_label": agent_label,
         "output": content,
-        "started_at": started_at.isoformat(),
-        "completed_at": completed_at.isoformat(),
-        "duration_ms": max((completed_at - started_at).total_seconds() * 1000, 0.0),
+        "started_at": started_at.wall.isoformat(),
+        "completed_at": (started_at.wall + timedelta(microseconds=elapsed_ns // 1000)).isoformat(),
+        "duration_ms": elapsed_ns / 1e6,
     }
     if metadata:
         trace["metadata"] = metadata
-    traces = list(state.get("agent_traces") or [])
-    traces.append(trace)
-    new_state = dict(state)
-    if updates:
-        new_state.update(updates)
-    new_state["agent_traces"] = traces
-    return new_state  # type: ignore[return-value]
+    if usage:
+        trace["usage"] = usage
+    # Return a state delta; the agent_traces reducer appends the new trace.
+    return {**(updates or {}), "agent_traces": [trace]}
 
 
 def _theory_label(slug: str) -> str:
-    for key, label in THEORY_LABELS:
-        if key == slug:
-            return label
-    return slug
+    return _THEORY_LABEL_MAP.get(slug, slug)
 
 
 def _problem_context(state: CouncilState) -> str:
@@ -138,36 +171,118 @@ def _problem_context(state: CouncilState) -> str:
     )
 
 
+# Fixed prompt headers, kept byte-identical across runs so provider prefix caches can hit.
+_IM_HDR = "\n\nIM ANCHOR SUMMARY:\n"
+_THEORIES_HDR = "\n\nTHEORY AGENT OUTPUTS:\n"
+_DEBATE_HDR = "\n\nDEBATE SUMMARY:\n"
+_RANKING_HDR = "\n\nTHEORY RANKING AND DECISION NOTE:\n"
+
+# System messages are built once and shared by reference, so every run sends the same objects.
+_PROBLEM_FRAMER_SYS_MSG = {"role": "system", "content": PROBLEM_FRAMER_SYSTEM_PROMPT}
+_IM_ANCHOR_SYS_MSG = {"role": "system", "content": IM_ANCHOR_SYSTEM_PROMPT}
+_THEORY_ROUTER_SYS_MSG = {
+    "role": "system",
+    "content": THEORY_ROUTER_SYSTEM_PROMPT.format(top_k=THEORY_ROUTER_TOP_K),
+}
+_DEBATE_MODERATOR_SYS_MSG = {"role": "system", "content": DEBATE_MODERATOR_SYSTEM_PROMPT}
+_THEORY_SELECTOR_SYS_MSG = {"role": "system", "content": THEORY_SELECTOR_SYSTEM_PROMPT}
+_INTEGRATOR_SYS_MSG = {"role": "system", "content": INTEGRATOR_SYSTEM_PROMPT}
+
+
 def _theory_agent_context(state: CouncilState) -> str:
-    return (
-        _problem_context(state)
-        + "\n\nIM ANCHOR SUMMARY:\n"
-        + (state.get("im_summary") or "")
-    )
+    return "".join([_problem_context(state), _IM_HDR, state.get("im_summary") or ""])
+
+
+def _theory_user_message(state: CouncilState) -> Dict[str, str]:
+    # im_anchor builds this once per run; it is only rebuilt for nodes invoked outside the graph.
+    return state.get("theory_user_message") or {"role": "user", "content": _theory_agent_context(state)}
+
+
+_THEORY_HEADERS: Tuple[Tuple[str, str], ...] = tuple(
+    (key, f"=== {label} OUTPUT ({key}) ===\n") for key, label in THEORY_LABELS
+)
 
 
 def _combined_theory_outputs(state: CouncilState) -> str:
     outputs = state.get("theory_outputs") or {}
-    combined = [
-        f"=== {_theory_label(key)} OUTPUT ({key}) ===\n{outputs[key]}"
-        for key, _ in THEORY_LABELS
-        if key in outputs
-    ]
-    return "\n\n".join(combined) if combined else "(no theory outputs yet)"
+    combined = "\n\n".join(header + outputs[key] for key, header in _THEORY_HEADERS if key in outputs)
+    return combined or "(no theory outputs yet)"
+
+
 
+def _is_error(response: GeminiResponse) -> bool:
+    return response.error or response.content.startswith(ERROR_RESPONSE_PREFIX)
+
+
+async def _run_agent(
+    llm: GeminiLCWrapper,
+    messages: List[Dict[str, str]],
+    agent_key: str,
+    *,
+    stream_sections: bool = False,
+) -> GeminiResponse:
+    """
+    Run an agent, forwarding its chunks to LangGraph's "custom" stream as they arrive.
+    With stream_sections, each integrator section is also emitted as soon as it is complete.
+    The agent's state field is still written once, with the full text, when the node completes.
+    """
+    try:
+        writer = get_stream_writer()
+    except (RuntimeError, KeyError):
+        # Called outside a graph run (e.g. a node invoked directly).
+        response = await llm.ainvoke(messages)
+        return GeminiResponse(response.content.strip(), usage=response.usage, error=_is_error(response))
+
+    parts: List[str] = []
+    usage: Optional[Dict[str, int]] = None
+    failure: Optional[GeminiResponse] = None
+    sections = SectionStreamParser() if stream_sections else None
+    async for chunk in llm.astream(messages):
+        usage = chunk.usage or usage
+        if _is_error(chunk):
+            # A stream can fail after partial text; the truncated reply must not pass as a result.
+            failure = chunk
+        if chunk.content:
+            parts.append(chunk.content)
+            writer({"agent_key": agent_key, "chunk": chunk.content})
+            if sections is not None:
+                for key, text in sections.feed(chunk.content):
+                    writer({"agent_key": agent_key, "section": key, "content": text})
+    if sections is not None:
+        for key, text in sections.close():
+            writer({"agent_key": agent_key, "section": key, "content": text})
+    if failure is not None:
+        return GeminiResponse(failure.content.strip(), usage=usage, error=True)
+    return GeminiResponse("".join(parts).strip(), usage=usage)
+
+
+@lru_cache(maxsize=16)
+def _shared_agent(store_name: Optional[str]) -> GeminiLCWrapper:
+    # Wrappers hold no per-call state, so one per File Search store serves every run.
+    llm = GeminiLCWrapper(store_name=store_name)
+    cache = get_response_cache()
+    return CachedLLM(llm, cache) if cache is not None else llm
+
+
+@lru_cache(maxsize=1)
+def _router_agent() -> GeminiLCWrapper:
+    # Deterministic and cached like the other agents, so a repeated problem skips the routing call.
+    llm = GeminiLCWrapper(model=THEORY_ROUTER_MODEL, temperature=0.0)
+    cache = get_response_cache()
+    return CachedLLM(llm, cache) if cache is not None else llm
 
 
 def get_gemini_agent(theory_key: Optional[str] = None) -> GeminiLCWrapper:
     """
     Factory for Gemini agents with optional RAG store attachment.
+    Agents are wrapped in the response cache when COUNCIL_LLM_CACHE is enabled.
+    Instances are shared per store; a re-sync that changes a theory's store picks up a new one.
     """
-    store_name = None
-    if theory_key:
-        store_name = get_theory_store_name(theory_key)
-    return GeminiLCWrapper(store_name=store_name)
+    store_name = get_theory_store_name(theory_key) if theory_key else None
+    return _shared_agent(store_name)
 
 
-def problem_framer(state: CouncilState) -> CouncilState:
+async def problem_framer(state: CouncilState) -> Dict[str, Any]:
     llm = get_gemini_agent()  # No RAG
     started = _now()
     
@@ -181,20 +296,20 @@ def problem_framer(state: CouncilState) -> CouncilState:
         history_text = f"\n\nCONVERSATION HISTORY:\n{formatted}"
 
     messages = [
-        {"role": "system", "content": PROBLEM_FRAMER_SYSTEM_PROMPT},
+        _PROBLEM_FRAMER_SYS_MSG,
         {
             "role": "user", 
             "content": f"USER REQUEST:\n{state['raw_problem']}{history_text}\n\nTask: Frame this problem for intervention mapping."
         },
     ]
-    response = llm.invoke(messages)
-    completed = _now()
-    content = response.content.strip()
+    response = await _run_agent(llm, messages, "problem_framer")
+    content = response.content
+    completed = perf_counter_ns()
     return _record_agent_progress(
-        state,
         agent_key="problem_framer",
         agent_label="Problem Framer",
         content=content,
+        usage=response.usage,
         started_at=started,
         completed_at=completed,
         metadata={"category": "framing"},
@@ -202,207 +317,174 @@ def problem_framer(state: CouncilState) -> CouncilState:
     )
 
 
-def im_anchor_agent(state: CouncilState) -> CouncilState:
+async def im_anchor_agent(state: CouncilState) -> Dict[str, Any]:
     llm = get_gemini_agent("im_anchor")
     started = _now()
+    problem_context = _problem_context(state)
     messages = [
-        {"role": "system", "content": IM_ANCHOR_SYSTEM_PROMPT},
-        {"role": "user", "content": _problem_context(state)},
+        _IM_ANCHOR_SYS_MSG,
+        {"role": "user", "content": problem_context},
     ]
-    response = llm.invoke(messages)
-    completed = _now()
-    content = response.content.strip()
+    response = await _run_agent(llm, messages, "im_anchor")
+    content = response.content
+    completed = perf_counter_ns()
     return _record_agent_progress(
-        state,
         agent_key="im_anchor",
         agent_label="IM Anchor",
         content=content,
+        usage=response.usage,
         started_at=started,
         completed_at=completed,
         metadata={"category": "anchor"},
-        updates={"im_summary": content},
+        # Every theory agent and aggregator shares this one message object.
+        updates={
+            "im_summary": content,
+            "theory_user_message": {"role": "user", "content": "".join([problem_context, _IM_HDR, content])},
+        },
     )
 
 
-def sct_agent(state: CouncilState) -> CouncilState:
-    llm = get_gemini_agent("sct")
-    started = _now()
-    messages = [
-        {"role": "system", "content": SCT_AGENT_SYSTEM_PROMPT},
-        {"role": "user", "content": _theory_agent_context(state)},
-    ]
-    response = llm.invoke(messages)
-    outputs = dict(state.get("theory_outputs") or {})
-    content = response.content.strip()
-    outputs["sct"] = content
-    completed = _now()
-    return _record_agent_progress(
-        state,
-        agent_key="sct",
-        agent_label=_theory_label("sct"),
-        content=content,
-        started_at=started,
-        completed_at=completed,
-        metadata={"category": "theory", "theory_key": "sct"},
-        updates={"theory_outputs": outputs},
-    )
+THEORY_SYSTEM_PROMPTS: Dict[str, str] = {
+    "sct": SCT_AGENT_SYSTEM_PROMPT,
+    "sdt": SDT_AGENT_SYSTEM_PROMPT,
+    "wise": WISE_AGENT_SYSTEM_PROMPT,
+    "ra": RA_AGENT_SYSTEM_PROMPT,
+    "env_impl": ENV_IMPL_AGENT_SYSTEM_PROMPT,
+}
+_THEORY_SYS_MSGS: Dict[str, Dict[str, str]] = {
+    key: {"role": "system", "content": prompt} for key, prompt in THEORY_SYSTEM_PROMPTS.items()
+}
 
 
-def sdt_agent(state: CouncilState) -> CouncilState:
-    llm = get_gemini_agent("sdt")
-    started = _now()
-    messages = [
-        {"role": "system", "content": SDT_AGENT_SYSTEM_PROMPT},
-        {"role": "user", "content": _theory_agent_context(state)},
-    ]
-    response = llm.invoke(messages)
-    outputs = dict(state.get("theory_outputs") or {})
-    content = response.content.strip()
-    outputs["sdt"] = content
-    completed = _now()
-    return _record_agent_progress(
-        state,
-        agent_key="sdt",
-        agent_label=_theory_label("sdt"),
-        content=content,
-        started_at=started,
-        completed_at=completed,
-        metadata={"category": "theory", "theory_key": "sdt"},
-        updates={"theory_outputs": outputs},
-    )
+def _make_theory_agent(key: str) -> Callable[[CouncilState], Awaitable[Dict[str, Any]]]:
+    """
+    Build the node for one theory agent; the five differ only in prompt and output key.
+    """
+    system_message = _THEORY_SYS_MSGS[key]
+    label = _theory_label(key)
+
+    async def theory_agent(state: CouncilState) -> Dict[str, Any]:
+        llm = get_gemini_agent(key)
+        started = _now()
+        messages = [
+            system_message,
+            _theory_user_message(state),
+        ]
+        response = await _run_agent(llm, messages, key)
+        content = response.content
+        completed = perf_counter_ns()
+        return _record_agent_progress(
+            agent_key=key,
+            agent_label=label,
+            content=content,
+            usage=response.usage,
+            started_at=started,
+            completed_at=completed,
+            metadata={"category": "theory", "theory_key": key},
+            updates={"theory_outputs": {key: content}},
+        )
 
+    theory_agent.__name__ = theory_agent.__qualname__ = f"{key}_agent"
+    return theory_agent
 
-def wise_agent(state: CouncilState) -> CouncilState:
-    llm = get_gemini_agent("wise")
-    started = _now()
-    messages = [
-        {"role": "system", "content": WISE_AGENT_SYSTEM_PROMPT},
-        {"role": "user", "content": _theory_agent_context(state)},
-    ]
-    response = llm.invoke(messages)
-    outputs = dict(state.get("theory_outputs") or {})
-    content = response.content.strip()
-    outputs["wise"] = content
-    completed = _now()
-    return _record_agent_progress(
-        state,
-        agent_key="wise",
-        agent_label=_theory_label("wise"),
-        content=content,
-        started_at=started,
-        completed_at=completed,
-        metadata={"category": "theory", "theory_key": "wise"},
-        updates={"theory_outputs": outputs},
-    )
+
+THEORY_AGENTS = {f"{key}_agent": _make_theory_agent(key) for key in THEORY_SYSTEM_PROMPTS}
+sct_agent = THEORY_AGENTS["sct_agent"]
+sdt_agent = THEORY_AGENTS["sdt_agent"]
+wise_agent = THEORY_AGENTS["wise_agent"]
+ra_agent = THEORY_AGENTS["ra_agent"]
+env_impl_agent = THEORY_AGENTS["env_impl_agent"]
 
 
-def ra_agent(state: CouncilState) -> CouncilState:
-    llm = get_gemini_agent("ra")
+async def theory_router(state: CouncilState) -> Dict[str, Any]:
+    """
+    Pick the most relevant theory agents from the raw problem with one cheap model call.
+    Runs alongside the problem framer; falls back to every theory if the reply is unusable.
+    """
+    llm = _router_agent()
     started = _now()
     messages = [
-        {"role": "system", "content": RA_AGENT_SYSTEM_PROMPT},
-        {"role": "user", "content": _theory_agent_context(state)},
+        _THEORY_ROUTER_SYS_MSG,
+        {"role": "user", "content": state["raw_problem"]},
     ]
-    response = llm.invoke(messages)
-    outputs = dict(state.get("theory_outputs") or {})
+    response = await llm.ainvoke(messages)
     content = response.content.strip()
-    outputs["ra"] = content
-    completed = _now()
+    completed = perf_counter_ns()
+    tokens = re.findall(r"[a-z_]+", content.lower())
+    selected = list(dict.fromkeys(token for token in tokens if token in _THEORY_LABEL_MAP))[:THEORY_ROUTER_TOP_K]
+    if not selected:
+        selected = list(_THEORY_LABEL_MAP)
     return _record_agent_progress(
-        state,
-        agent_key="ra",
-        agent_label=_theory_label("ra"),
-        content=content,
+        agent_key="theory_router",
+        agent_label="Theory Router",
+        content=", ".join(selected),
+        usage=response.usage,
         started_at=started,
         completed_at=completed,
-        metadata={"category": "theory", "theory_key": "ra"},
-        updates={"theory_outputs": outputs},
+        metadata={"category": "routing"},
+        updates={"selected_theories": selected},
     )
 
 
-def env_impl_agent(state: CouncilState) -> CouncilState:
-    llm = get_gemini_agent("env_impl")
-    started = _now()
-    messages = [
-        {"role": "system", "content": ENV_IMPL_AGENT_SYSTEM_PROMPT},
-        {"role": "user", "content": _theory_agent_context(state)},
-    ]
-    response = llm.invoke(messages)
-    outputs = dict(state.get("theory_outputs") or {})
-    content = response.content.strip()
-    outputs["env_impl"] = content
-    completed = _now()
-    return _record_agent_progress(
-        state,
-        agent_key="env_impl",
-        agent_label=_theory_label("env_impl"),
-        content=content,
-        started_at=started,
-        completed_at=completed,
-        metadata={"category": "theory", "theory_key": "env_impl"},
-        updates={"theory_outputs": outputs},
-    )
+def _route_theories(state: CouncilState) -> List[str]:
+    selected = state.get("selected_theories") or [key for key, _ in THEORY_LABELS]
+    return [f"{key}_agent" for key in selected]
 
 
-def debate_moderator(state: CouncilState) -> CouncilState:
+async def debate_moderator(state: CouncilState) -> Dict[str, Any]:
     llm = get_gemini_agent()  # No RAG
     started = _now()
     theories_text = _combined_theory_outputs(state)
     messages = [
-        {"role": "system", "content": DEBATE_MODERATOR_SYSTEM_PROMPT},
+        _DEBATE_MODERATOR_SYS_MSG,
         {
             "role": "user",
-            "content": (
-                _problem_context(state)
-                + "\n\nIM ANCHOR SUMMARY:\n"
-                f"{state.get('im_summary') or ''}\n\n"
-                "THEORY AGENT OUTPUTS:\n"
-                f"{theories_text}"
-            ),
+            "content": "".join([_theory_user_message(state)["content"], _THEORIES_HDR, theories_text]),
         },
     ]
-    response = llm.invoke(messages)
-    completed = _now()
-    content = response.content.strip()
+    response = await _run_agent(llm, messages, "debate_moderator")
+    content = response.content
+    completed = perf_counter_ns()
     return _record_agent_progress(
-        state,
         agent_key="debate_moderator",
         agent_label="Debate Moderator",
         content=content,
+        usage=response.usage,
         started_at=started,
         completed_at=completed,
         metadata={"category": "synthesis"},
-        updates={"debate_summary": content},
+        # Shared with theory_selector and integrator so the join runs once per council.
+        updates={"debate_summary": content, "theories_text": theories_text},
     )
 
 
-def theory_selector(state: CouncilState) -> CouncilState:
+async def theory_selector(state: CouncilState) -> Dict[str, Any]:
     llm = get_gemini_agent()  # No RAG
     started = _now()
-    theories_text = _combined_theory_outputs(state)
+    theories_text = state.get("theories_text") or _combined_theory_outputs(state)
     messages = [
-        {"role": "system", "content": THEORY_SELECTOR_SYSTEM_PROMPT},
+        _THEORY_SELECTOR_SYS_MSG,
         {
             "role": "user",
-            "content": (
-                _problem_context(state)
-                + "\n\nIM ANCHOR SUMMARY:\n"
-                f"{state.get('im_summary') or ''}\n\n"
-                "THEORY AGENT OUTPUTS:\n"
-                f"{theories_text}\n\n"
-                "DEBATE SUMMARY:\n"
-                f"{state.get('debate_summary') or ''}"
+            "content": "".join(
+                [
+                    _theory_user_message(state)["content"],
+                    _THEORIES_HDR,
+                    theories_text,
+                    _DEBATE_HDR,
+                    state.get("debate_summary") or "",
+                ]
             ),
         },
     ]
-    response = llm.invoke(messages)
-    completed = _now()
-    content = response.content.strip()
+    response = await _run_agent(llm, messages, "theory_selector")
+    content = response.content
+    completed = perf_counter_ns()
     return _record_agent_progress(
-        state,
         agent_key="theory_selector",
         agent_label="Theory Selector",
         content=content,
+        usage=response.usage,
         started_at=started,
         completed_at=completed,
         metadata={"category": "decision"},
@@ -410,35 +492,54 @@ def theory_selector(state: CouncilState) -> CouncilState:
     )
 
 
-def integrator(state: CouncilState) -> CouncilState:
-    llm = get_gemini_agent()  # No RAG, replacing get_integrator_llm()
+def _usable_theory_outputs(state: CouncilState) -> int:
+    outputs = (state.get("theory_outputs") or {}).values()
+    return sum(1 for text in outputs if text.strip() and not text.startswith(ERROR_RESPONSE_PREFIX))
+
+
+async def integrator(state: CouncilState) -> Dict[str, Any]:
     started = _now()
-    theories_text = _combined_theory_outputs(state)
+    # The synthesis is the largest call in the run; skip it when the theories mostly failed.
+    expected = len(state.get("selected_theories") or THEORY_NODES)
+    if _usable_theory_outputs(state) < min(INTEGRATOR_MIN_THEORY_OUTPUTS, expected):
+        logger.warning("Skipping the integrator: too few usable theory outputs.")
+        return _record_agent_progress(
+            agent_key="integrator",
+            agent_label="Integrator",
+            content=SKIPPED_SYNTHESIS,
+            started_at=started,
+            completed_at=perf_counter_ns(),
+            metadata={"category": "integrator", "skipped": True},
+            updates={"final_synthesis": SKIPPED_SYNTHESIS},
+        )
+
+    llm = get_gemini_agent()  # No RAG, replacing get_integrator_llm()
+    theories_text = state.get("theories_text") or _combined_theory_outputs(state)
     messages = [
-        {"role": "system", "content": INTEGRATOR_SYSTEM_PROMPT},
+        _INTEGRATOR_SYS_MSG,
         {
             "role": "user",
-            "content": (
-                _problem_context(state)
-                + "\n\nIM ANCHOR SUMMARY:\n"
-                f"{state.get('im_summary') or ''}\n\n"
-                "THEORY AGENT OUTPUTS:\n"
-                f"{theories_text}\n\n"
-                "DEBATE SUMMARY:\n"
-                f"{state.get('debate_summary') or ''}\n\n"
-                "THEORY RANKING AND DECISION NOTE:\n"
-                f"{state.get('theory_ranking') or ''}"
+            "content": "".join(
+                [
+                    _theory_user_message(state)["content"],
+                    _THEORIES_HDR,
+                    theories_text,
+                    _DEBATE_HDR,
+                    state.get("debate_summary") or "",
+                    _RANKING_HDR,
+                    state.get("theory_ranking") or "",
+                ]
             ),
         },
     ]
-    response = llm.invoke(messages)
-    completed = _now()
-    content = response.content.strip()
+    response = await _run_agent(llm, messages, "integrator", stream_sections=True)
+    content = response.content
+    completed = perf_counter_ns()
     return _record_agent_progress(
-        state,
         agent_key="integrator",
         agent_label="Integrator",
         content=content,
+        usage=response.usage,
         started_at=started,
         completed_at=completed,
         metadata={"category": "integrator"},
@@ -446,31 +547,115 @@ def integrator(state: CouncilState) -> CouncilState:
     )
 
 
-def build_graph() -> Any:
+THEORY_NODES = tuple(THEORY_AGENTS)
+
+
+def _merge_deltas(deltas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    outputs: Dict[str, str] = {}
+    traces: List[AgentTrace] = []
+    for delta in deltas:
+        outputs.update(delta.get("theory_outputs") or {})
+        traces.extend(delta.get("agent_traces") or [])
+    return {"theory_outputs": outputs, "agent_traces": traces}
+
+
+async def theory_batch(state: CouncilState) -> Dict[str, Any]:
+    """
+    Batch-mode replacement for the theory fan-out: one Gemini Batch API job for all theories.
+    Falls back to the live agents if the job fails or misses COUNCIL_BATCH_TIMEOUT_S.
+    """
+    keys = state.get("selected_theories") or list(THEORY_SYSTEM_PROMPTS)
+    started = _now()
+    user_message = _theory_user_message(state)
+    agents = {key: get_gemini_agent(key) for key in keys}
+    requests = {
+        key: agent.batch_request(
+            [
+                _THEORY_SYS_MSGS[key],
+                user_message,
+            ]
+        )
+        for key, agent in agents.items()
+    }
+    model = next(iter(agents.values())).model
+    outcome = await arun_inline_batch(get_shared_client(), model, requests)
+    if outcome is None:
+        deltas = await asyncio.gather(*(THEORY_AGENTS[f"{key}_agent"](state) for key in keys))
+        return _merge_deltas(list(deltas))
+
+    completed = perf_counter_ns()
+    return _merge_deltas(
+        [
+            _record_agent_progress(
+                agent_key=key,
+                agent_label=_theory_label(key),
+                content=response.content,
+                usage=response.usage,
+                started_at=started,
+                completed_at=completed,
+                metadata={"category": "theory", "theory_key": key, "batch_job": outcome.job_name},
+                updates={"theory_outputs": {key: response.content}},
+            )
+            for key, response in outcome.responses.items()
+        ]
+    )
+
+
+def _router_enabled() -> bool:
+    return os.environ.get("COUNCIL_THEORY_ROUTER", "").lower() in {"1", "true", "yes"}
+
+
+def _batch_api_enabled() -> bool:
+    # Deployment-wide default for batch_mode, for latency-tolerant workers.
+    return os.environ.get("COUNCIL_USE_BATCH_API", "").lower() in {"1", "true", "yes"}
+
+
+def build_graph(*, batch_mode: bool = False, use_router: Optional[bool] = None) -> Any:
     """
-    Assemble and compile the sequential Theory Council graph.
+    Assemble and compile the Theory Council graph.
+
+    The five theory agents only depend on the framing and IM anchor, so they fan out
+    in parallel after ``im_anchor`` and join again at ``debate_moderator``. With
+    COUNCIL_THEORY_ROUTER enabled, a router runs beside the problem framer and only
+    the theories it selects are fanned out. With batch_mode, a single ``theory_batch``
+    node submits every theory prompt as one Batch API job instead.
     """
+    if use_router is None:
+        use_router = _router_enabled()
     graph = StateGraph(CouncilState)
 
     graph.add_node("problem_framer", problem_framer)
     graph.add_node("im_anchor", im_anchor_agent)
-    graph.add_node("sct_agent", sct_agent)
-    graph.add_node("sdt_agent", sdt_agent)
-    graph.add_node("wise_agent", wise_agent)
-    graph.add_node("ra_agent", ra_agent)
-    graph.add_node("env_impl_agent", env_impl_agent)
+    if batch_mode:
+        graph.add_node("theory_batch", theory_batch)
+    else:
+        for node, agent in THEORY_AGENTS.items():
+            graph.add_node(node, agent)
     graph.add_node("debate_moderator", debate_moderator)
     graph.add_node("theory_selector", theory_selector)
     graph.add_node("integrator", integrator)
 
     graph.set_entry_point("problem_framer")
-    graph.add_edge("problem_framer", "im_anchor")
-    graph.add_edge("im_anchor", "sct_agent")
-    graph.add_edge("sct_agent", "sdt_agent")
-    graph.add_edge("sdt_agent", "wise_agent")
-    graph.add_edge("wise_agent", "ra_agent")
-    graph.add_edge("ra_agent", "env_impl_agent")
-    graph.add_edge("env_impl_agent", "debate_moderator")
+    if use_router:
+        graph.add_node("theory_router", theory_router)
+        graph.set_entry_point("theory_router")
+        graph.add_edge(["problem_framer", "theory_router"], "im_anchor")
+    else:
+        graph.add_edge("problem_framer", "im_anchor")
+
+    if batch_mode:
+        # theory_batch reads selected_theories itself, so the router needs no conditional edges.
+        graph.add_edge("im_anchor", "theory_batch")
+        graph.add_edge("theory_batch", "debate_moderator")
+    elif use_router:
+        graph.add_conditional_edges("im_anchor", _route_theories, list(THEORY_NODES))
+        # Only the routed subset runs, so join per edge rather than waiting on all five.
+        for node in THEORY_NODES:
+            graph.add_edge(node, "debate_moderator")
+    else:
+        for node in THEORY_NODES:
+            graph.add_edge("im_anchor", node)
+        graph.add_edge(list(THEORY_NODES), "debate_moderator")
     graph.add_edge("debate_moderator", "theory_selector")
     graph.add_edge("theory_selector", "integrator")
     graph.add_edge("integrator", END)
@@ -478,44 +663,90 @@ def build_graph() -> Any:
     return graph.compile()
 
 
-def get_app() -> Any:
+@lru_cache(maxsize=4)
+def _cached_app(batch_mode: bool, use_router: bool) -> Any:
+    # Nodes keep no per-run state, so one compiled graph serves concurrent invocations.
+    return build_graph(batch_mode=batch_mode, use_router=use_router)
+
+
+def get_app(*, batch_mode: bool = False) -> Any:
     """
     Convenience helper for callers that just need the compiled graph.
+    Compiled once per (batch_mode, COUNCIL_THEORY_ROUTER) combination and shared.
+    """
+    return _cached_app(batch_mode, _router_enabled())
+
+
+def _reset_app_cache() -> None:
+    """
+    Drop the compiled graphs and shared agents, e.g. between tests that patch nodes or env.
     """
-    return build_graph()
+    _cached_app.cache_clear()
+    _shared_agent.cache_clear()
+    _router_agent.cache_clear()
+
+
+# One pass over the text finds every header line; section bodies are the slices between them.
+_HEADER_KEYS: Dict[str, str] = dict(SECTION_HEADERS)
+_HEADER_RE = re.compile(
+    r"^[^\S\n]*(" + "|".join(re.escape(header) for header, _ in SECTION_HEADERS) + r")[^\n]*$",
+    re.MULTILINE,
+)
 
 
-def _parse_integrator_sections(text: str) -> Dict[str, str]:
+def parse_integrator_sections(text: str) -> Dict[str, str]:
     """
     Split the integrator output into the four expected sections for the UI.
     """
     sections = {key: "" for _, key in SECTION_HEADERS}
-    if not text.strip():
-        return sections
-
-    header_lookup = {header: key for header, key in SECTION_HEADERS}
-    current_key: Optional[str] = None
-    buffer: List[str] = []
-
-    for line in text.splitlines():
-        stripped = line.strip()
-        matched_key = next(
-            (header_lookup[header] for header in header_lookup if stripped.startswith(header)),
-            None,
-        )
-        if matched_key:
-            if current_key is not None:
-                sections[current_key] = "\n".join(buffer).strip()
-            current_key = matched_key
-            buffer = []
-        else:
-            if current_key is not None:
-                buffer.append(line)
+    matches = list(_HEADER_RE.finditer(text))
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        end = next_match.start() if next_match else len(text)
+        sections[_HEADER_KEYS[match.group(1)]] = text[match.end():end].strip()
+    return sections
 
-    if current_key is not None:
-        sections[current_key] = "\n".join(buffer).strip()
 
-    return sections
+class SectionStreamParser:
+    """
+    Incremental counterpart to parse_integrator_sections for streamed integrator text.
+    feed() returns the sections closed by a newly seen header; close() flushes the last one.
+    """
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._current_key: Optional[str] = None
+        self._buffer: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        completed: List[Tuple[str, str]] = []
+        for line in lines:
+            completed.extend(self._consume(line))
+        return completed
+
+    def close(self) -> List[Tuple[str, str]]:
+        completed = self._consume(self._pending) if self._pending else []
+        self._pending = ""
+        if self._current_key is not None:
+            completed.append((self._current_key, "\n".join(self._buffer).strip()))
+            self._current_key = None
+            self._buffer = []
+        return completed
+
+    def _consume(self, line: str) -> List[Tuple[str, str]]:
+        match = _HEADER_RE.match(line)
+        matched_key = _HEADER_KEYS[match.group(1)] if match else None
+        if matched_key is None:
+            if self._current_key is not None:
+                self._buffer.append(line)
+            return []
+        completed = []
+        if self._current_key is not None:
+            completed.append((self._current_key, "\n".join(self._buffer).strip()))
+        self._current_key = matched_key
+        self._buffer = []
+        return completed
 
 
 def run_council_pipeline(
@@ -523,29 +754,58 @@ def run_council_pipeline(
     *,
     metadata: Optional[Dict[str, Any]] = None,
     app: Optional[Any] = None,
+    batch_mode: Optional[bool] = None,
 ) -> CouncilPipelineResult:
     """
     High-level helper to execute the LangGraph workflow and return structured output.
+
+    The agent nodes are async, so this runs the graph on a private event loop; call it
+    from threads or scripts, and use arun_council_pipeline inside a running loop.
+    batch_mode sends the theory agents through the Gemini Batch API (cheaper, slower);
+    it defaults to the COUNCIL_USE_BATCH_API setting.
+    """
+    return asyncio.run(
+        arun_council_pipeline(problem, metadata=metadata, app=app, batch_mode=batch_mode)
+    )
+
+
+async def arun_council_pipeline(
+    problem: str,
+    *,
+    metadata: Optional[Dict[str, Any]] = None,
+    app: Optional[Any] = None,
+    batch_mode: Optional[bool] = None,
+) -> CouncilPipelineResult:
+    """
+    Async variant of run_council_pipeline for event-loop callers.
     """
+    if batch_mode is None:
+        batch_mode = _batch_api_enabled()
     initial_state: CouncilState = {
         "raw_problem": problem,
         "framed_problem": None,
         "im_summary": None,
         "theory_outputs": {},
+        "theory_user_message": None,
+        "theories_text": None,
         "debate_summary": None,
         "theory_ranking": None,
         "final_synthesis": None,
         "agent_traces": [],
     }
 
-    compiled = app or get_app()
+    compiled = app or get_app(batch_mode=batch_mode)
     invoke_kwargs: Dict[str, Any] = {}
     if metadata:
         invoke_kwargs["config"] = {"metadata": metadata}
 
-    result: CouncilState = compiled.invoke(initial_state, **invoke_kwargs)
+    result: CouncilState = await compiled.ainvoke(initial_state, **invoke_kwargs)
+    return _to_pipeline_result(problem, result)
+
+
+def _to_pipeline_result(problem: str, result: CouncilState) -> CouncilPipelineResult:
     final_text = (result.get("final_synthesis") or "").strip()
-    sections = _parse_integrator_sections(final_text)
+    sections = parse_integrator_sections(final_text)
 
     return {
         "raw_problem": problem,
@@ -569,12 +829,41 @@ def stream_council_pipeline(
 ) -> Iterator[CouncilState]:
     """
     Generator that yields updates from the Council pipeline as agents complete.
+    Drives astream_council_pipeline on a private event loop.
+    """
+    loop = asyncio.new_event_loop()
+    updates = astream_council_pipeline(
+        problem, metadata=metadata, chat_history=chat_history, app=app
+    )
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(updates.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(updates.aclose())
+        loop.close()
+
+
+async def astream_council_pipeline(
+    problem: str,
+    *,
+    metadata: Optional[Dict[str, Any]] = None,
+    chat_history: Optional[List[Dict[str, str]]] = None,
+    app: Optional[Any] = None,
+) -> Any:  # AsyncIterator[CouncilState] but typing can be tricky with async gens
+    """
+    Async generator that yields updates from the Council pipeline as agents complete.
+    Allows for cancellation propagation.
     """
     initial_state: CouncilState = {
         "raw_problem": problem,
         "framed_problem": None,
         "im_summary": None,
         "theory_outputs": {},
+        "theory_user_message": None,
+        "theories_text": None,
         "debate_summary": None,
         "theory_ranking": None,
         "final_synthesis": None,
@@ -587,28 +876,31 @@ def stream_council_pipeline(
     if metadata:
         invoke_kwargs["config"] = {"metadata": metadata}
 
-    for step_output in compiled.stream(initial_state, **invoke_kwargs):
-        # step_output is like {"node_name": updated_state}
-        for _, state in step_output.items():
-            yield state
+    # Nodes return deltas, so stream the merged state after each superstep.
+    async for state in compiled.astream(initial_state, stream_mode="values", **invoke_kwargs):
+        yield state
 
 
-async def astream_council_pipeline(
+async def astream_council_events(
     problem: str,
     *,
     metadata: Optional[Dict[str, Any]] = None,
     chat_history: Optional[List[Dict[str, str]]] = None,
     app: Optional[Any] = None,
-) -> Any:  # AsyncIterator[CouncilState] but typing can be tricky with async gens
+) -> Any:  # AsyncIterator[Tuple[str, Dict[str, Any]]]
     """
-    Async generator that yields updates from the Council pipeline as agents complete.
-    Allows for cancellation propagation.
+    Like astream_council_pipeline, but yields per-node deltas plus the agents' custom events.
+    Yields ("updates", {node: delta}) as each node finishes and ("custom", event) in between,
+    where event is {"agent_key", "chunk"} or, for the integrator, {"agent_key", "section",
+    "content"}. Fold the deltas into a running state with merge_council_update.
     """
     initial_state: CouncilState = {
         "raw_problem": problem,
         "framed_problem": None,
         "im_summary": None,
         "theory_outputs": {},
+        "theory_user_message": None,
+        "theories_text": None,
         "debate_summary": None,
         "theory_ranking": None,
         "final_synthesis": None,
@@ -621,10 +913,24 @@ async def astream_council_pipeline(
     if metadata:
         invoke_kwargs["config"] = {"metadata": metadata}
 
-    async for step_output in compiled.astream(initial_state, **invoke_kwargs):
-        # step_output is like {"node_name": updated_state}
-        for _, state in step_output.items():
-            yield state
+    async for mode, payload in compiled.astream(
+        initial_state, stream_mode=["updates", "custom"], **invoke_kwargs
+    ):
+        yield mode, payload
+
+
+def merge_council_update(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold one node's delta into a caller-held state, applying the graph's reducers.
+    """
+    for key, value in delta.items():
+        if key == "agent_traces":
+            state[key] = (state.get(key) or []) + list(value)
+        elif key == "theory_outputs":
+            state[key] = _merge_theory_outputs(state.get(key) or {}, value)
+        else:
+            state[key] = value
+    return state
 
 
 __all__ = [
@@ -638,14 +944,21 @@ __all__ = [
     "wise_agent",
     "ra_agent",
     "env_impl_agent",
+    "theory_router",
+    "theory_batch",
     "debate_moderator",
     "theory_selector",
     "integrator",
     "build_graph",
     "get_app",
+    "parse_integrator_sections",
+    "SectionStreamParser",
     "run_council_pipeline",
+    "arun_council_pipeline",
     "stream_council_pipeline",
     "astream_council_pipeline",
+    "astream_council_events",
+    "merge_council_update",
 ]
 
 
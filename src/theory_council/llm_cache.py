@@ -0,0 +1,307 @@
+"""
+Opt-in exact-match response cache for council agents.
+
+With COUNCIL_LLM_CACHE=1, every agent call is keyed on a SHA-256 of
+(model, temperature, File Search store, messages), so re-running the council on the
+same problem (dev iterations, demos, evaluations) returns in microseconds. Entries
+persist under ~/.cache/theory_council when ``diskcache`` is installed and fall back
+to a bounded in-process TTL cache otherwise. COUNCIL_LLM_CACHE=redis shares entries
+between API workers through COUNCIL_REDIS_URL instead. Async agent calls reach Redis
+through redis.asyncio and the local backends through a worker thread, and a failing
+backend only costs a cache miss.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import weakref
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Protocol
+
+import orjson
+from cachetools import TTLCache
+
+from .gemini_llm import ERROR_RESPONSE_PREFIX, GeminiLCWrapper, GeminiResponse
+
+try:
+    import diskcache
+except ImportError:  # pragma: no cover - optional dependency
+    diskcache = None
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+    aioredis = None
+
+logger = logging.getLogger("theory_council.llm_cache")
+
+LLM_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "theory_council", "llm_responses")
+DEFAULT_TTL_S = 7 * 24 * 3600
+MEMORY_MAX_ENTRIES = 1024
+
+
+class CacheBackend(Protocol):
+    """
+    The get/set subset of diskcache.Cache that the response cache relies on, plus
+    awaitable variants for callers on the event loop.
+    """
+
+    def get(self, key: str) -> Optional[str]: ...
+
+    def set(self, key: str, value: str, expire: Optional[float] = None) -> None: ...
+
+    async def aget(self, key: str) -> Optional[str]: ...
+
+    async def aset(self, key: str, value: str, expire: Optional[float] = None) -> None: ...
+
+
+class _ThreadedAsyncMixin:
+    """
+    Awaitable get/set that run the blocking calls in a worker thread.
+    """
+
+    async def aget(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, key)  # type: ignore[attr-defined]
+
+    async def aset(self, key: str, value: str, expire: Optional[float] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, expire)  # type: ignore[attr-defined]
+
+
+class _MemoryCache(_ThreadedAsyncMixin):
+    """
+    Thread-safe TTL cache with the get/set subset of diskcache.Cache that CachedLLM uses.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._entries: TTLCache[str, str] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key: str, value: str, expire: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = value
+
+
+class _DiskCache(_ThreadedAsyncMixin):
+    """
+    diskcache.Cache adapter; disk reads and writes from the event loop go through a worker thread.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self._cache = diskcache.Cache(directory)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str, expire: Optional[float] = None) -> None:
+        self._cache.set(key, value, expire=expire)
+
+
+class _RedisCache:
+    """
+    Redis backend so every API worker serves the same cached responses.
+    """
+
+    def __init__(self, url: str, prefix: str = "theory_council:llm") -> None:
+        if redis is None:
+            raise RuntimeError("COUNCIL_LLM_CACHE=redis requires the 'redis' package (pip install redis).")
+        self._url = url
+        self._client = redis.Redis.from_url(url)
+        # redis.asyncio connections belong to the loop that opened them, and the sync pipeline
+        # entry point runs each council on a fresh loop, so keep one async client per loop.
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._prefix = prefix
+
+    def _async_client(self) -> Any:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = aioredis.Redis.from_url(self._url)
+            self._async_clients[loop] = client
+        return client
+
+    def get(self, key: str) -> Optional[str]:
+        raw = self._client.get(f"{self._prefix}:{key}")
+        return raw.decode() if raw is not None else None
+
+    def set(self, key: str, value: str, expire: Optional[float] = None) -> None:
+        self._client.set(f"{self._prefix}:{key}", value, ex=int(expire) if expire else None)
+
+    async def aget(self, key: str) -> Optional[str]:
+        raw = await self._async_client().get(f"{self._prefix}:{key}")
+        return raw.decode() if raw is not None else None
+
+    async def aset(self, key: str, value: str, expire: Optional[float] = None) -> None:
+        await self._async_client().set(f"{self._prefix}:{key}", value, ex=int(expire) if expire else None)
+
+
+class LLMCache:
+    """
+    Response cache over a CacheBackend that counts hits and misses for observability.
+    Backend failures are logged and treated as misses so a cache outage never fails a run.
+    """
+
+    def __init__(self, backend: CacheBackend) -> None:
+        self._backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, value: Optional[str]) -> Optional[str]:
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self._backend.get(key)
+        except Exception:
+            logger.warning("LLM response cache read failed; treating as a miss.", exc_info=True)
+            value = None
+        return self._count(value)
+
+    def set(self, key: str, value: str, expire: Optional[float] = None) -> None:
+        try:
+            self._backend.set(key, value, expire=expire)
+        except Exception:
+            logger.warning("LLM response cache write failed; skipping it.", exc_info=True)
+
+    async def aget(self, key: str) -> Optional[str]:
+        try:
+            value = await self._backend.aget(key)
+        except Exception:
+            logger.warning("LLM response cache read failed; treating as a miss.", exc_info=True)
+            value = None
+        return self._count(value)
+
+    async def aset(self, key: str, value: str, expire: Optional[float] = None) -> None:
+        try:
+            await self._backend.aset(key, value, expire=expire)
+        except Exception:
+            logger.warning("LLM response cache write failed; skipping it.", exc_info=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+def response_cache_key(
+    model: str, temperature: float, store_name: Optional[str], messages: List[Dict[str, str]]
+) -> str:
+    payload = orjson.dumps([model, temperature, store_name, messages], option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(payload).hexdigest()
+
+
+class CachedLLM:
+    """
+    Wraps a GeminiLCWrapper and serves repeated prompts from the response cache.
+    Error responses, including streams that fail part-way, are never stored.
+    """
+
+    def __init__(self, llm: GeminiLCWrapper, cache: CacheBackend, ttl_seconds: float = DEFAULT_TTL_S) -> None:
+        self._llm = llm
+        self._cache = cache
+        self._ttl = ttl_seconds
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._llm, name)
+
+    def _key(self, messages: List[Dict[str, str]]) -> str:
+        return response_cache_key(self._llm.model, self._llm.temperature, self._llm.store_name, messages)
+
+    @staticmethod
+    def _cacheable(content: str) -> bool:
+        return bool(content) and not content.startswith(ERROR_RESPONSE_PREFIX)
+
+    def _store(self, key: str, content: str) -> None:
+        if self._cacheable(content):
+            self._cache.set(key, content, expire=self._ttl)
+
+    async def _astore(self, key: str, content: str) -> None:
+        if self._cacheable(content):
+            await self._cache.aset(key, content, expire=self._ttl)
+
+    def invoke(self, messages: List[Dict[str, str]]) -> GeminiResponse:
+        key = self._key(messages)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return GeminiResponse(content=cached)
+        response = self._llm.invoke(messages)
+        self._store(key, response.content)
+        return response
+
+    async def ainvoke(self, messages: List[Dict[str, str]]) -> GeminiResponse:
+        key = self._key(messages)
+        cached = await self._cache.aget(key)
+        if cached is not None:
+            return GeminiResponse(content=cached)
+        response = await self._llm.ainvoke(messages)
+        await self._astore(key, response.content)
+        return response
+
+    def stream(self, messages: List[Dict[str, str]]) -> Iterator[GeminiResponse]:
+        key = self._key(messages)
+        cached = self._cache.get(key)
+        if cached is not None:
+            yield GeminiResponse(content=cached)
+            return
+        parts: List[str] = []
+        failed = False
+        for chunk in self._llm.stream(messages):
+            # A stream can fail after partial text; its error chunk then sits mid-reply.
+            failed = failed or chunk.content.startswith(ERROR_RESPONSE_PREFIX)
+            parts.append(chunk.content)
+            yield chunk
+        if not failed:
+            self._store(key, "".join(parts))
+
+    async def astream(self, messages: List[Dict[str, str]]) -> AsyncIterator[GeminiResponse]:
+        key = self._key(messages)
+        cached = await self._cache.aget(key)
+        if cached is not None:
+            yield GeminiResponse(content=cached)
+            return
+        parts: List[str] = []
+        failed = False
+        async for chunk in self._llm.astream(messages):
+            failed = failed or chunk.content.startswith(ERROR_RESPONSE_PREFIX)
+            parts.append(chunk.content)
+            yield chunk
+        if not failed:
+            await self._astore(key, "".join(parts))
+
+
+@lru_cache(maxsize=1)
+def get_response_cache() -> Optional[LLMCache]:
+    """
+    Return the process-wide response cache when COUNCIL_LLM_CACHE is enabled, else None.
+    COUNCIL_LLM_CACHE=redis selects the shared Redis backend at COUNCIL_REDIS_URL.
+    """
+    setting = os.environ.get("COUNCIL_LLM_CACHE", "").lower()
+    if setting == "redis":
+        url = os.environ.get("COUNCIL_REDIS_URL", "redis://localhost:6379/0")
+        logger.info("LLM response cache enabled in Redis at %s.", url)
+        return LLMCache(_RedisCache(url))
+    if setting not in {"1", "true", "yes"}:
+        return None
+    if diskcache is not None:
+        logger.info("LLM response cache enabled at %s.", LLM_CACHE_DIR)
+        return LLMCache(_DiskCache(LLM_CACHE_DIR))
+    logger.info("LLM response cache enabled in memory (install diskcache to persist it).")
+    return LLMCache(_MemoryCache(MEMORY_MAX_ENTRIES, DEFAULT_TTL_S))
+
+
+__all__ = ["CacheBackend", "CachedLLM", "LLMCache", "get_response_cache", "response_cache_key"]
@@ -4,25 +4,51 @@ keep lightweight session state for the chat endpoint.
 """
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, TypedDict
+import logging
+import os
+import re
+import threading
+from itertools import islice
+from typing import Any, Dict, List, Optional, Protocol, Tuple, TypedDict
+
+import orjson
+from cachetools import TTLCache
 
 from .chat import ChatMessage
 from .graph import CouncilPipelineResult
 
-ESCALATION_KEYWORDS = {
-    "analysis",
-    "analyze",
-    "council",
+try:
+    import redis
+except ImportError:
+    # Only needed when COUNCIL_SESSION_BACKEND=redis
+    redis = None
+
+logger = logging.getLogger("theory_council.orchestration")
+
+DEFAULT_SESSION_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_SESSIONS = 10_000
+
+# Ordered shortest (and most common) first; the alternation tries keywords in this order.
+ESCALATION_KEYWORDS: Tuple[str, ...] = (
+    "theory",
     "debate",
-    "full plan",
-    "im guide",
-    "intervention design",
+    "council",
     "mapping",
+    "analyze",
+    "analysis",
+    "strategy",
+    "im guide",
+    "full plan",
     "multi-agent",
     "run council",
-    "strategy",
-    "theory",
-}
+    "intervention design",
+)
+# One case-insensitive alternation scans the raw message once, without a lowered copy.
+_ESCALATION_RE = re.compile("|".join(re.escape(keyword) for keyword in ESCALATION_KEYWORDS), re.IGNORECASE)
+_WORD_RE = re.compile(r"\S+")
+LONG_MESSAGE_WORDS = 120
+LONG_MESSAGE_CHARS = 800
+FIRST_RUN_WORDS = 40
 
 
 class SessionState(TypedDict, total=False):
@@ -32,45 +58,248 @@ class SessionState(TypedDict, total=False):
     last_council_result: Optional[CouncilPipelineResult]
 
 
+class StoredRun(TypedDict):
+    result: CouncilPipelineResult
+    session_id: Optional[str]
+
+
+class SessionBackend(Protocol):
+    """
+    Storage interface shared by the in-process and Redis session stores.
+    """
+
+    def get(self, session_id: str) -> Optional[SessionState]: ...
+
+    def get_or_create(self, session_id: str) -> SessionState: ...
+
+    def replace_messages(self, session_id: str, messages: List[ChatMessage]) -> SessionState: ...
+
+    def append_message(self, session_id: str, message: ChatMessage) -> SessionState: ...
+
+    def record_council_run(self, session_id: str, run_id: str, result: CouncilPipelineResult) -> SessionState: ...
+
+    def get_run(self, run_id: str) -> Optional[CouncilPipelineResult]: ...
+
+    def get_run_record(self, run_id: str) -> Optional[StoredRun]: ...
+
+
 class InMemorySessionStore:
     """
-    Simplistic in-memory store for chat sessions. Swap out later for Redis/DB.
+    Simplistic in-memory store for chat sessions. Only valid for a single worker process.
+    Sessions expire after ``ttl_seconds`` without a write, and the least recently used are
+    evicted beyond ``maxsize``, so a long-lived server does not grow without bound.
     """
 
-    def __init__(self) -> None:
-        self._sessions: Dict[str, SessionState] = {}
+    def __init__(
+        self,
+        *,
+        maxsize: int = DEFAULT_MAX_SESSIONS,
+        ttl_seconds: int = DEFAULT_SESSION_TTL_SECONDS,
+    ) -> None:
+        self._sessions: TTLCache[str, SessionState] = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        # Reentrant because get_or_create is called from the other locked methods.
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
 
     def get(self, session_id: str) -> Optional[SessionState]:
-        return self._sessions.get(session_id)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return session
 
     def get_or_create(self, session_id: str) -> SessionState:
-        session = self._sessions.get(session_id)
+        with self._lock:
+            session = self.get(session_id)
+            if session:
+                return session
+            session = {
+                "session_id": session_id,
+                "messages": [],
+                "last_run_id": None,
+                "last_council_result": None,
+            }
+            self._sessions[session_id] = session
+            return session
+
+    # Writes re-insert the session so its TTL restarts on activity.
+    def replace_messages(self, session_id: str, messages: List[ChatMessage]) -> SessionState:
+        with self._lock:
+            session = self.get_or_create(session_id)
+            session["messages"] = list(messages)
+            self._sessions[session_id] = session
+            return session
+
+    def append_message(self, session_id: str, message: ChatMessage) -> SessionState:
+        with self._lock:
+            session = self.get_or_create(session_id)
+            session.setdefault("messages", []).append(message)
+            self._sessions[session_id] = session
+            return session
+
+    def record_council_run(self, session_id: str, run_id: str, result: CouncilPipelineResult) -> SessionState:
+        with self._lock:
+            session = self.get_or_create(session_id)
+            session["last_run_id"] = run_id
+            session["last_council_result"] = result
+            self._sessions[session_id] = session
+            return session
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._sessions),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+            }
+
+    def get_run(self, run_id: str) -> Optional[CouncilPipelineResult]:
+        # In a single process the server's bounded RUN_LOG is the run index; evicted runs stay evicted.
+        return None
+
+    def get_run_record(self, run_id: str) -> Optional[StoredRun]:
+        return None
+
+
+class RedisSessionStore:
+    """
+    Redis-backed session store so several API workers can share sessions and council runs.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        ttl_seconds: int = DEFAULT_SESSION_TTL_SECONDS,
+        prefix: str = "theory_council",
+    ) -> None:
+        if redis is None:
+            raise RuntimeError("COUNCIL_SESSION_BACKEND=redis requires the 'redis' package (pip install redis).")
+        self._client = redis.Redis.from_url(url)
+        self._ttl = ttl_seconds
+        self._prefix = prefix
+
+    def _session_key(self, session_id: str) -> str:
+        return f"{self._prefix}:session:{session_id}"
+
+    def _messages_key(self, session_id: str) -> str:
+        return f"{self._prefix}:messages:{session_id}"
+
+    def _run_key(self, run_id: str) -> str:
+        return f"{self._prefix}:run:{run_id}"
+
+    def _queue_session_read(self, pipe: Any, session_id: str) -> None:
+        pipe.hget(self._session_key(session_id), "last_run_id")
+        pipe.lrange(self._messages_key(session_id), 0, -1)
+
+    def _build_session(
+        self,
+        session_id: str,
+        raw_run_id: Optional[bytes],
+        raw_messages: List[bytes],
+        last_result: Optional[CouncilPipelineResult] = None,
+    ) -> SessionState:
+        last_run_id = raw_run_id.decode() if raw_run_id else None
+        if last_run_id and last_result is None:
+            last_result = self.get_run(last_run_id)
+        return {
+            "session_id": session_id,
+            "messages": [orjson.loads(item) for item in raw_messages],
+            "last_run_id": last_run_id,
+            "last_council_result": last_result,
+        }
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        pipe = self._client.pipeline(transaction=False)
+        self._queue_session_read(pipe, session_id)
+        raw_run_id, raw_messages = pipe.execute()
+        if raw_run_id is None and not raw_messages:
+            return None
+        return self._build_session(session_id, raw_run_id, raw_messages)
+
+    def get_or_create(self, session_id: str) -> SessionState:
+        session = self.get(session_id)
         if session:
             return session
-        session = {
+        return {
             "session_id": session_id,
             "messages": [],
             "last_run_id": None,
             "last_council_result": None,
         }
-        self._sessions[session_id] = session
-        return session
 
+    # Writes queue the session read-back in the same pipeline. That is one round trip, plus a
+    # get_run for the last council result once the session has one (record_council_run skips it).
     def replace_messages(self, session_id: str, messages: List[ChatMessage]) -> SessionState:
-        session = self.get_or_create(session_id)
-        session["messages"] = list(messages)
-        return session
+        key = self._messages_key(session_id)
+        pipe = self._client.pipeline()
+        pipe.delete(key)
+        if messages:
+            pipe.rpush(key, *(orjson.dumps(message) for message in messages))
+            pipe.expire(key, self._ttl)
+        self._queue_session_read(pipe, session_id)
+        raw_run_id, raw_messages = pipe.execute()[-2:]
+        return self._build_session(session_id, raw_run_id, raw_messages)
 
     def append_message(self, session_id: str, message: ChatMessage) -> SessionState:
-        session = self.get_or_create(session_id)
-        session.setdefault("messages", []).append(message)
-        return session
+        key = self._messages_key(session_id)
+        pipe = self._client.pipeline()
+        pipe.rpush(key, orjson.dumps(message))
+        pipe.expire(key, self._ttl)
+        self._queue_session_read(pipe, session_id)
+        raw_run_id, raw_messages = pipe.execute()[-2:]
+        return self._build_session(session_id, raw_run_id, raw_messages)
 
     def record_council_run(self, session_id: str, run_id: str, result: CouncilPipelineResult) -> SessionState:
-        session = self.get_or_create(session_id)
-        session["last_run_id"] = run_id
-        session["last_council_result"] = result
-        return session
+        session_key = self._session_key(session_id)
+        pipe = self._client.pipeline()
+        # The session id travels with the run so any worker can rebuild the original response.
+        record: StoredRun = {"result": result, "session_id": session_id}
+        pipe.set(self._run_key(run_id), orjson.dumps(record), ex=self._ttl)
+        pipe.hset(session_key, "last_run_id", run_id)
+        pipe.expire(session_key, self._ttl)
+        self._queue_session_read(pipe, session_id)
+        raw_run_id, raw_messages = pipe.execute()[-2:]
+        # The run was just written, so it is not read back.
+        return self._build_session(session_id, raw_run_id, raw_messages, last_result=result)
+
+    def get_run(self, run_id: str) -> Optional[CouncilPipelineResult]:
+        record = self.get_run_record(run_id)
+        return record["result"] if record else None
+
+    def get_run_record(self, run_id: str) -> Optional[StoredRun]:
+        raw = self._client.get(self._run_key(run_id))
+        if not raw:
+            return None
+        data = orjson.loads(raw)
+        if "result" not in data:
+            # Written before runs carried their session id.
+            return {"result": data, "session_id": None}
+        return data
+
+
+def build_session_store() -> SessionBackend:
+    """
+    Select the session backend from COUNCIL_SESSION_BACKEND (memory|redis).
+    """
+    backend = os.environ.get("COUNCIL_SESSION_BACKEND", "memory").strip().lower()
+    if backend == "redis":
+        url = os.environ.get("COUNCIL_REDIS_URL", "redis://localhost:6379/0")
+        logger.info("Using Redis session store at %s", url)
+        return RedisSessionStore(url)
+    if backend != "memory":
+        raise RuntimeError(f"Unknown COUNCIL_SESSION_BACKEND '{backend}'; expected 'memory' or 'redis'.")
+    return InMemorySessionStore()
+
+
+def _count_words(text: str, limit: int) -> int:
+    # Stops at ``limit``; the thresholds never need the exact count of a longer message.
+    return sum(1 for _ in islice(_WORD_RE.finditer(text), limit))
 
 
 def _extract_last_user_message(messages: List[ChatMessage]) -> Optional[str]:
@@ -96,19 +325,21 @@ def should_escalate_to_council(
     if not last_user_message:
         return False
 
-    text = last_user_message.strip().lower()
     if metadata and metadata.get("force_council"):
         return True
 
-    if any(keyword in text for keyword in ESCALATION_KEYWORDS):
+    if _ESCALATION_RE.search(last_user_message):
+        return True
+
+    if len(last_user_message) > LONG_MESSAGE_CHARS:
         return True
 
-    word_count = len(text.split())
-    if word_count >= 120 or len(text) > 800:
+    word_count = _count_words(last_user_message, LONG_MESSAGE_WORDS)
+    if word_count >= LONG_MESSAGE_WORDS:
         return True
 
     has_prior_run = bool(session_state and session_state.get("last_run_id"))
-    if not has_prior_run and word_count >= 40:
+    if not has_prior_run and word_count >= FIRST_RUN_WORDS:
         return True
 
     return False
@@ -116,7 +347,11 @@ def should_escalate_to_council(
 
 __all__ = [
     "InMemorySessionStore",
+    "RedisSessionStore",
+    "SessionBackend",
     "SessionState",
+    "StoredRun",
+    "build_session_store",
     "should_escalate_to_council",
 ]
 
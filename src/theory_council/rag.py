@@ -4,17 +4,39 @@ Handles PDF ingestion, vector store creation, and context retrieval.
 """
 from __future__ import annotations
 
+import glob
+import hashlib
+import itertools
 import os
 import shutil
-from typing import List, Optional, TypedDict
+import sqlite3
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, TypedDict
 
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
+import numpy as np
+from chromadb.api.client import SharedSystemClient
+from chromadb.utils.batch_utils import create_batches
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
 # from langchain_openai import OpenAIEmbeddings # Removed
 from langchain_google_genai import GoogleGenerativeAIEmbeddings # Added
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+try:
+    import pypdfium2
+except ImportError:  # pragma: no cover - optional dependency
+    pypdfium2 = None
+
 from .config import get_langsmith_settings, get_google_api_key
+from .gemini_store import THEORY_CONTEXT_DIRS
+from .similarity_cache import SimilarityCache, normalize_vector
 
 # Paths
 # Assuming the code is running from project root or src/..
@@ -23,15 +45,220 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "../../"))
 CONTEXT_DIR = os.path.join(PROJECT_ROOT, "context")
 DB_DIR = os.path.join(PROJECT_ROOT, ".chroma_db")
+# Lives outside DB_DIR so a force_refresh rebuild keeps it. Vectors are stored as float16, half the
+# size of float32; at 768 dimensions the rounding does not change nearest-neighbour order in practice.
+EMBED_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "theory_council", "embeddings.sqlite")
+EMBEDDING_MODEL = "models/text-embedding-004"
+# Texts per embedding request; the Gemini embeddings endpoint accepts up to 100.
+EMBED_BATCH_SIZE = int(os.environ.get("GOOGLE_EMBED_BATCH", "100"))
+# Chunks are embedded and written in batches of this size while the PDFs are still being parsed.
+INDEX_WRITE_BATCH = 256
+# Near-duplicate queries (cosine >= threshold) reuse an earlier search instead of hitting Chroma.
+SEMANTIC_QUERY_THRESHOLD = float(os.environ.get("COUNCIL_RAG_SEMANTIC_THRESHOLD", "0.97"))
+SEMANTIC_QUERY_MAX_ENTRIES = 128
+
+CONTEXT_PROMPT_HEADER = "RELEVANT THEORY CONTEXT (from uploaded documents):"
 
 class RetrievedChunk(TypedDict):
     content: str
     source: str
     page: int
 
+def _theory_for_source(source: str) -> Optional[str]:
+    """
+    Map a PDF path to its theory key via the top-level context subdirectory.
+    """
+    relative = os.path.relpath(source, CONTEXT_DIR)
+    top_level = relative.split(os.sep, 1)[0]
+    entry = THEORY_CONTEXT_DIRS.get(top_level)
+    return entry[0] if entry else None
+
+@lru_cache(maxsize=1)
 def _get_embeddings():
+    # One client (and connection pool) per process instead of one per query.
     api_key = get_google_api_key()
-    return GoogleGenerativeAIEmbeddings(model="models/text-embedding-004", google_api_key=api_key)
+    return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, google_api_key=api_key)
+
+
+_vectorstore: Optional[Chroma] = None
+_vectorstore_lock = threading.Lock()
+
+
+def _get_vectorstore() -> Chroma:
+    """
+    Shared Chroma handle, opened once under a lock so concurrent first queries don't race.
+    Only called once DB_DIR exists; build_index drops the handle when it rebuilds the store.
+    """
+    global _vectorstore
+    if _vectorstore is None:
+        with _vectorstore_lock:
+            if _vectorstore is None:
+                _vectorstore = Chroma(
+                    persist_directory=DB_DIR,
+                    embedding_function=_get_embeddings(),
+                    collection_name="theory_context"
+                )
+    return _vectorstore
+
+
+# Keyed on (k, theories) so a cached search is only reused for the same request shape.
+_semantic_query_cache: SimilarityCache[Tuple[int, Optional[Tuple[str, ...]]], List[RetrievedChunk]] = SimilarityCache(
+    SEMANTIC_QUERY_THRESHOLD, SEMANTIC_QUERY_MAX_ENTRIES
+)
+
+
+def _reset_index_handles() -> None:
+    global _vectorstore
+    with _vectorstore_lock:
+        _vectorstore = None
+    _get_embeddings.cache_clear()
+    _cached_query_context.cache_clear()
+    _embed_query.cache_clear()
+    _semantic_query_cache.clear()
+
+def _embedding_key(text: str) -> str:
+    return hashlib.sha256(f"{EMBEDDING_MODEL}\0{text}".encode()).hexdigest()
+
+
+def _prepare_embed_cache() -> None:
+    """
+    Create the embedding cache table; run once per build, before the first write batch.
+    """
+    os.makedirs(os.path.dirname(EMBED_CACHE_PATH), exist_ok=True)
+    with closing(sqlite3.connect(EMBED_CACHE_PATH)) as conn, conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS embeddings_f16 (hash TEXT PRIMARY KEY, vec BLOB)")
+        # float32 rows from before the float16 switch are never read again.
+        conn.execute("DROP TABLE IF EXISTS embeddings")
+
+
+def _embed_with_cache(texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts, reusing vectors stored by earlier builds so only new content hits the API.
+    Expects _prepare_embed_cache to have run.
+    """
+    keys = [_embedding_key(text) for text in texts]
+    with closing(sqlite3.connect(EMBED_CACHE_PATH)) as conn:
+        vectors: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        # Stay well under SQLite's bound-parameter limit.
+        for start in range(0, len(unique_keys), 500):
+            batch = unique_keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT hash, vec FROM embeddings_f16 WHERE hash IN ({','.join('?' * len(batch))})", batch
+            )
+            vectors.update((key, np.frombuffer(blob, dtype=np.float16).astype(np.float32).tolist()) for key, blob in rows)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        print(f"Embedding cache: {len(unique_keys) - len(missing)} hits, {len(missing)} to embed.")
+        embeddings = _get_embeddings()
+        missing_keys = list(missing)
+        # One request per batch, committed as it lands so an interrupted build keeps its progress.
+        for start in range(0, len(missing_keys), EMBED_BATCH_SIZE):
+            batch = missing_keys[start:start + EMBED_BATCH_SIZE]
+            fresh = np.asarray(
+                embeddings.embed_documents([missing[key] for key in batch], batch_size=EMBED_BATCH_SIZE),
+                dtype=np.float16,
+            )
+            # Index the rounded vectors too, so a rebuild from the cache writes exactly the same store.
+            vectors.update(zip(batch, fresh.astype(np.float32).tolist()))
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings_f16 (hash, vec) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in zip(batch, fresh)],
+                )
+    return [vectors[key] for key in keys]
+
+
+def _load_pdf_with_pdfium(path: str) -> List[Document]:
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        pages: List[Document] = []
+        for index in range(len(pdf)):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range()
+            textpage.close()
+            page.close()
+            # Same source/page metadata as PyPDFLoader, so theory tagging and citations are unchanged.
+            pages.append(Document(
+                page_content=text,
+                metadata={"source": path, "page": index, "total_pages": len(pdf)},
+            ))
+        return pages
+    finally:
+        pdf.close()
+
+
+def _load_pdf(path: str) -> List[Document]:
+    # Module-level so the process pool can pickle it. pdfium's C extractor is several
+    # times faster than pure-Python pypdf, which stays as the fallback.
+    if pypdfium2 is not None:
+        return _load_pdf_with_pdfium(path)
+    return PyPDFLoader(path).load()
+
+
+def _iter_context_pdfs() -> Iterator[List[Document]]:
+    """
+    Yield the pages of each PDF under CONTEXT_DIR, one file at a time, parsing ahead in worker processes.
+    """
+    pdf_paths = sorted(glob.glob(os.path.join(CONTEXT_DIR, "**", "*.pdf"), recursive=True))
+    if not pdf_paths:
+        return
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    workers = min(len(pdf_paths), cpus)
+    if workers <= 1:
+        # A pool only adds process start-up cost on a single core.
+        yield from map(_load_pdf, pdf_paths)
+        return
+    print(f"Parsing {len(pdf_paths)} PDFs with {workers} worker processes...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # pool.map would parse every file up front; a small window keeps only a few PDFs in memory.
+        pending = deque(pool.submit(_load_pdf, path) for path in pdf_paths[:workers * 2])
+        for path in pdf_paths[workers * 2:]:
+            yield pending.popleft().result()
+            pending.append(pool.submit(_load_pdf, path))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _create_collection():
+    print("Creating vector store...")
+    # Vectors are precomputed, so write straight to the collection instead of re-embedding.
+    return Chroma(
+        persist_directory=DB_DIR,
+        embedding_function=_get_embeddings(),
+        collection_name="theory_context"
+    )._collection
+
+
+def _compact_page_metadata(pages: List[Document]) -> None:
+    """
+    Trim one PDF's page metadata to what retrieval reads, resolving its basename and theory once.
+    """
+    if not pages:
+        return
+    source = pages[0].metadata.get("source", "")
+    shared = {"source": os.path.basename(source)}
+    # Every theory shares one collection; the theory tag lets queries filter in a single search.
+    theory = _theory_for_source(source)
+    if theory:
+        shared["theory"] = theory
+    for page in pages:
+        page.metadata = {**shared, "page": page.metadata.get("page", 0)}
+
+
+def _write_chunks(collection, splits: List[Document]) -> None:
+    texts = [split.page_content for split in splits]
+    embeddings = _embed_with_cache(texts)
+    for ids, vectors, metadatas, documents in create_batches(
+        api=collection._client,
+        ids=[str(uuid.uuid4()) for _ in splits],
+        embeddings=embeddings,
+        metadatas=[split.metadata for split in splits],
+        documents=texts,
+    ):
+        collection.add(ids=ids, embeddings=vectors, metadatas=metadatas, documents=documents)
+
 
 def build_index(force_refresh: bool = False):
     """
@@ -40,77 +267,128 @@ def build_index(force_refresh: bool = False):
     if force_refresh and os.path.exists(DB_DIR):
         print(f"Removing existing DB at {DB_DIR}...")
         shutil.rmtree(DB_DIR)
+        _reset_index_handles()
+        # Chroma caches one client per path; drop it so the rebuilt store is opened fresh.
+        SharedSystemClient.clear_system_cache()
 
     if os.path.exists(DB_DIR) and not force_refresh:
         print("Vector store already exists. Skipping ingestion (use force_refresh=True to rebuild).")
         return
 
     print(f"Loading PDFs from {CONTEXT_DIR}...")
-    loader = DirectoryLoader(CONTEXT_DIR, glob="**/*.pdf", loader_cls=PyPDFLoader, show_progress=True)
-    documents = loader.load()
-
-    if not documents:
-        print("No PDF documents found in context directory.")
-        return
-
-    print(f"Loaded {len(documents)} document pages.")
-    
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,
         add_start_index=True,
     )
-    splits = text_splitter.split_documents(documents)
-    print(f"Split into {len(splits)} chunks.")
+    # Pages are split and flushed to the collection as each PDF arrives, so only
+    # one write batch of chunks (plus the parse-ahead window) is held in memory.
+    _prepare_embed_cache()
+    collection = None
+    page_count = chunk_count = 0
+    pending: List[Document] = []
+    for pages in _iter_context_pdfs():
+        page_count += len(pages)
+        _compact_page_metadata(pages)
+        pending.extend(text_splitter.split_documents(pages))
+        while len(pending) >= INDEX_WRITE_BATCH:
+            if collection is None:
+                collection = _create_collection()
+            _write_chunks(collection, pending[:INDEX_WRITE_BATCH])
+            chunk_count += INDEX_WRITE_BATCH
+            pending = pending[INDEX_WRITE_BATCH:]
+    if pending:
+        if collection is None:
+            collection = _create_collection()
+        _write_chunks(collection, pending)
+        chunk_count += len(pending)
 
-    print("Creating vector store...")
-    Chroma.from_documents(
-        documents=splits,
-        embedding=_get_embeddings(),
-        persist_directory=DB_DIR,
-        collection_name="theory_context"
-    )
+    if collection is None:
+        print("No PDF documents found in context directory.")
+        return
+
+    print(f"Indexed {chunk_count} chunks from {page_count} document pages.")
     print("Vector store created and persisted.")
+    _reset_index_handles()
 
-def query_context(query: str, k: int = 4) -> List[RetrievedChunk]:
+def query_context(
+    query: str, k: int = 4, theories: Optional[Sequence[str]] = None
+) -> List[RetrievedChunk]:
     """
     Search the vector store for context relevant to the query.
+    Pass theory keys (e.g. ["sct", "sdt"]) to restrict the search to those theories' documents.
+    Repeated queries (modulo whitespace) are served from an LRU cache, and near-duplicates
+    from a semantic cache keyed on the query embedding.
     """
+    theory_filter = tuple(sorted(set(theories))) if theories else None
+    return list(_cached_query_context(" ".join(query.split()), k, theory_filter))
+
+
+@lru_cache(maxsize=512)
+def _cached_query_context(
+    query: str, k: int, theories: Optional[Tuple[str, ...]] = None
+) -> Tuple[RetrievedChunk, ...]:
+    return tuple(_search_vector_store(query, k, theories))
+
+
+@lru_cache(maxsize=256)
+def _embed_query(model: str, query: str) -> Tuple[float, ...]:
+    # The model name is part of the key so a model switch never reuses stale vectors.
+    return tuple(_get_embeddings().embed_query(query))
+
+
+def _search_vector_store(
+    query: str, k: int, theories: Optional[Tuple[str, ...]] = None
+) -> List[RetrievedChunk]:
     if not os.path.exists(DB_DIR):
         print("Warning: Vector store not found. Returning empty context.")
         return []
 
-    vectorstore = Chroma(
-        persist_directory=DB_DIR,
-        embedding_function=_get_embeddings(),
-        collection_name="theory_context"
-    )
-    
-    results = vectorstore.similarity_search(query, k=k)
+    vectorstore = _get_vectorstore()
+    # Embed once: the vector drives both the semantic cache lookup and the Chroma search.
+    # Case is kept: acronyms such as "SCT" or "IM" embed differently from their lower-cased words.
+    embedding = list(_embed_query(EMBEDDING_MODEL, query.strip()))
+    query_vector = normalize_vector(embedding)
+    cached = _semantic_query_cache.lookup(query_vector, (k, theories))
+    if cached is not None:
+        return list(cached)
+
+    search_filter = None
+    if theories:
+        search_filter = {"theory": theories[0]} if len(theories) == 1 else {"theory": {"$in": list(theories)}}
+    results = vectorstore.similarity_search_by_vector(embedding, k=k, filter=search_filter)
     
     retrieved: List[RetrievedChunk] = []
     for doc in results:
         retrieved.append({
             "content": doc.page_content,
+            # New stores hold the basename already; stores built earlier still hold absolute paths.
             "source": os.path.basename(doc.metadata.get("source", "")),
             "page": doc.metadata.get("page", 0) + 1, # 1-indexed
         })
-        
+
+    _semantic_query_cache.add(query_vector, (k, theories), retrieved)
     return retrieved
 
 def format_context_for_prompt(chunks: List[RetrievedChunk]) -> str:
     """
     Format retrieved chunks into a string for the LLM system prompt.
+    Chunks from the same page of the same PDF share one SOURCE block, in first-seen order.
     """
     if not chunks:
         return ""
-    
-    formatted = ["RELEVANT THEORY CONTEXT (from uploaded documents):"]
-    for i, chunk in enumerate(chunks, 1):
-        formatted.append(f"--- SOURCE {i} ({chunk['source']}, p.{chunk['page']}) ---")
-        formatted.append(f"\"{chunk['content']}\"")
-    
-    return "\n\n".join(formatted)
+
+    pages: Dict[Tuple[str, int], List[str]] = {}
+    for chunk in chunks:
+        pages.setdefault((chunk["source"], chunk["page"]), []).append(chunk["content"])
+
+    return "\n\n".join(itertools.chain(
+        (CONTEXT_PROMPT_HEADER,),
+        (
+            f"--- SOURCE {i} ({source}, p.{page}) ---\n\n\"{' '.join(contents)}\""
+            for i, ((source, page), contents) in enumerate(pages.items(), 1)
+        ),
+    ))
 
 if __name__ == "__main__":
     # Allow running this script directly to build the index
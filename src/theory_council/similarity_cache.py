@@ -0,0 +1,65 @@
+"""
+Bounded in-process cosine-similarity cache shared by the semantic chat and RAG query caches.
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def normalize_vector(values: List[float]) -> np.ndarray:
+    """
+    Return a float32 unit vector so a dot product is the cosine similarity.
+    """
+    vector = np.asarray(values, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SimilarityCache(Generic[K, V]):
+    """
+    (unit vector, match key) -> payload. A lookup returns the closest entry at or above the
+    threshold whose key equals the query's; the key carries whatever must match exactly.
+    """
+
+    def __init__(self, threshold: float, max_entries: int) -> None:
+        self._threshold = threshold
+        self._lock = threading.Lock()
+        # Oldest entries fall off first; the matrix is rebuilt lazily from the deque.
+        self._entries: Deque[Tuple[np.ndarray, K, V]] = deque(maxlen=max_entries)
+        self._matrix: Optional[np.ndarray] = None
+
+    def lookup(self, vector: np.ndarray, key: K) -> Optional[V]:
+        with self._lock:
+            if not self._entries:
+                return None
+            if self._matrix is None:
+                self._matrix = np.stack([entry[0] for entry in self._entries])
+            scores = self._matrix @ vector
+            entries = list(self._entries)
+        for index in np.argsort(scores)[::-1]:
+            if scores[index] < self._threshold:
+                break
+            _, entry_key, payload = entries[index]
+            if entry_key == key:
+                return payload
+        return None
+
+    def add(self, vector: np.ndarray, key: K, payload: V) -> None:
+        with self._lock:
+            self._entries.append((vector, key, payload))
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+
+__all__ = ["SimilarityCache", "normalize_vector"]
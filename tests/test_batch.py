@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import pytest
+from google.genai import types
+
+from theory_council import batch
+from theory_council.gemini_llm import GeminiLCWrapper
+
+
+def _inlined(text: Optional[str], error: Any = None) -> types.InlinedResponse:
+    response = None
+    if text is not None:
+        response = types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=10, candidates_token_count=5
+            ),
+        )
+    return types.InlinedResponse(response=response, error=error)
+
+
+def _job(state: types.JobState, responses: Optional[List[types.InlinedResponse]] = None) -> types.BatchJob:
+    dest = types.BatchJobDestination(inlined_responses=responses) if responses is not None else None
+    return types.BatchJob(name="batches/123", state=state, dest=dest)
+
+
+class FakeBatches:
+    def __init__(self, jobs: List[types.BatchJob]) -> None:
+        self.jobs = jobs
+        self.created: Optional[dict] = None
+        self.cancelled: List[str] = []
+
+    async def create(self, **kwargs: Any) -> types.BatchJob:
+        self.created = kwargs
+        return self.jobs.pop(0)
+
+    async def get(self, name: str) -> types.BatchJob:
+        return self.jobs.pop(0)
+
+    async def cancel(self, name: str) -> None:
+        self.cancelled.append(name)
+
+
+def _client(batches: FakeBatches) -> Any:
+    return SimpleNamespace(aio=SimpleNamespace(batches=batches))
+
+
+@pytest.fixture(autouse=True)
+def no_poll_delay(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(batch, "BATCH_POLL_INITIAL_S", 0.0)
+
+
+def _requests() -> dict:
+    return {
+        key: types.InlinedRequest(model="gemini-test", contents=f"{key} prompt")
+        for key in ("sct", "sdt")
+    }
+
+
+def test_batch_maps_inline_responses_to_request_keys():
+    batches = FakeBatches([
+        _job(types.JobState.JOB_STATE_PENDING),
+        _job(types.JobState.JOB_STATE_SUCCEEDED, [_inlined(" SCT view "), _inlined("SDT view")]),
+    ])
+
+    outcome = asyncio.run(batch.arun_inline_batch(_client(batches), "gemini-test", _requests()))
+
+    assert [request.contents for request in batches.created["src"]] == ["sct prompt", "sdt prompt"]
+    assert batches.created["model"] == "gemini-test"
+    assert outcome.job_name == "batches/123"
+    assert outcome.responses["sct"].content == "SCT view"
+    assert outcome.responses["sdt"].content == "SDT view"
+    assert outcome.responses["sct"].usage == {"prompt_tokens": 10, "output_tokens": 5}
+
+
+def test_batch_with_a_failed_inline_response_returns_none():
+    failed = _inlined(None, error=types.JobError(message="quota exceeded"))
+    batches = FakeBatches([_job(types.JobState.JOB_STATE_SUCCEEDED, [_inlined("SCT view"), failed])])
+
+    assert asyncio.run(batch.arun_inline_batch(_client(batches), "gemini-test", _requests())) is None
+
+
+def test_batch_that_misses_its_deadline_is_cancelled():
+    batches = FakeBatches([_job(types.JobState.JOB_STATE_RUNNING)])
+
+    outcome = asyncio.run(batch.arun_inline_batch(_client(batches), "gemini-test", _requests(), timeout_s=0))
+
+    assert outcome is None
+    assert batches.cancelled == ["batches/123"]
+
+
+def test_wrapper_batch_request_carries_system_prompt_in_config(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    llm = GeminiLCWrapper(model="gemini-test", store_name="fileSearchStores/sct")
+
+    request = llm.batch_request([
+        {"role": "system", "content": "You are the SCT agent."},
+        {"role": "user", "content": "Problem"},
+    ])
+
+    assert request.model == "gemini-test"
+    assert request.config.system_instruction == "You are the SCT agent."
+    assert request.config.tools[0].file_search.file_search_store_names == ["fileSearchStores/sct"]
+    assert [part.text for content in request.contents for part in content.parts] == ["Problem"]
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import numpy as np
+
+from theory_council.chat_cache import SemanticChatCache
+from theory_council.similarity_cache import normalize_vector
+
+
+def _unit(*values: float) -> np.ndarray:
+    return normalize_vector(list(values))
+
+
+def _cache(**kwargs) -> SemanticChatCache:
+    # lookup/add never touch the client; only match/amatch embed.
+    return SemanticChatCache(client=None, **kwargs)
+
+
+def test_lookup_requires_similarity_above_threshold():
+    cache = _cache(threshold=0.97)
+    cache.add(_unit(1.0, 0.0), "gemini", "SCT answer")
+
+    assert cache.lookup(_unit(1.0, 0.1), "gemini") == "SCT answer"  # cosine ~0.995
+    assert cache.lookup(_unit(1.0, 0.4), "gemini") is None  # cosine ~0.93
+    assert cache.lookup(_unit(0.0, 1.0), "gemini") is None
+
+
+def test_lookup_is_keyed_by_model():
+    cache = _cache()
+    cache.add(_unit(1.0, 0.0), "gemini-flash", "flash answer")
+    cache.add(_unit(1.0, 0.0), "gemini-pro", "pro answer")
+
+    assert cache.lookup(_unit(1.0, 0.0), "gemini-pro") == "pro answer"
+    assert cache.lookup(_unit(1.0, 0.0), "gemini-flash") == "flash answer"
+    assert cache.lookup(_unit(1.0, 0.0), "other-model") is None
+
+
+def test_oldest_entries_are_evicted():
+    cache = _cache(max_entries=2)
+    cache.add(_unit(1.0, 0.0, 0.0), "gemini", "first")
+    cache.add(_unit(0.0, 1.0, 0.0), "gemini", "second")
+    cache.add(_unit(0.0, 0.0, 1.0), "gemini", "third")
+
+    assert cache.lookup(_unit(1.0, 0.0, 0.0), "gemini") is None
+    assert cache.lookup(_unit(0.0, 1.0, 0.0), "gemini") == "second"
+    assert cache.lookup(_unit(0.0, 0.0, 1.0), "gemini") == "third"
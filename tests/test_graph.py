@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from theory_council import graph
+from theory_council.gemini_llm import ERROR_RESPONSE_PREFIX, GeminiResponse
+
+
+class StreamingAgent:
+    def __init__(self, chunks: List[GeminiResponse]) -> None:
+        self.chunks = chunks
+
+    async def astream(self, messages: List[Dict[str, str]]):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def test_run_agent_flags_stream_that_fails_after_partial_text(monkeypatch: pytest.MonkeyPatch):
+    written: List[Dict[str, Any]] = []
+    monkeypatch.setattr(graph, "get_stream_writer", lambda: written.append)
+    agent = StreamingAgent([
+        GeminiResponse("Partial SCT analysis"),
+        GeminiResponse(f"{ERROR_RESPONSE_PREFIX}connection reset", error=True),
+    ])
+
+    response = asyncio.run(graph._run_agent(agent, [], "sct"))
+
+    assert response.error
+    assert response.content.startswith(ERROR_RESPONSE_PREFIX)
+    assert written[0] == {"agent_key": "sct", "chunk": "Partial SCT analysis"}
+
+
+def test_integrator_skips_when_theory_streams_failed(monkeypatch: pytest.MonkeyPatch):
+    def fail(*_, **__):
+        raise AssertionError("the integrator should not call the model")
+
+    monkeypatch.setattr(graph, "get_gemini_agent", fail)
+    state = {
+        "selected_theories": ["sct", "sdt"],
+        "theory_outputs": {"sct": "Usable analysis", "sdt": f"{ERROR_RESPONSE_PREFIX}connection reset"},
+    }
+
+    delta = asyncio.run(graph.integrator(state))
+
+    assert delta["final_synthesis"] == graph.SKIPPED_SYNTHESIS
+    assert delta["agent_traces"][0]["metadata"]["skipped"] is True
+
+
+class RouterLLM:
+    def __init__(self, reply: str) -> None:
+        self.reply = reply
+
+    async def ainvoke(self, messages: List[Dict[str, str]]) -> GeminiResponse:
+        return GeminiResponse(self.reply)
+
+
+def _route(monkeypatch: pytest.MonkeyPatch, reply: str) -> List[str]:
+    monkeypatch.setattr(graph, "get_stream_writer", lambda: lambda _: None)
+    monkeypatch.setattr(graph, "THEORY_ROUTER_TOP_K", 2)
+    monkeypatch.setattr(graph, "_router_agent", lambda: RouterLLM(reply))
+    delta = asyncio.run(graph.theory_router({"raw_problem": "Students skip tutoring sessions."}))
+    return delta["selected_theories"]
+
+
+def test_theory_router_keeps_top_k_known_theories(monkeypatch: pytest.MonkeyPatch):
+    assert _route(monkeypatch, "SDT, wise, sdt, unknown, sct") == ["sdt", "wise"]
+
+
+def test_theory_router_falls_back_to_all_theories(monkeypatch: pytest.MonkeyPatch):
+    assert _route(monkeypatch, "No clear match here.") == [key for key, _ in graph.THEORY_LABELS]
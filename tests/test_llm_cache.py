@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional
+
+from theory_council.gemini_llm import ERROR_RESPONSE_PREFIX, GeminiResponse
+from theory_council.llm_cache import DEFAULT_TTL_S, CachedLLM, LLMCache, _MemoryCache
+
+MESSAGES = [{"role": "user", "content": "Frame this problem"}]
+
+
+class FakeLLM:
+    model = "gemini-test"
+    temperature = 0.3
+    store_name = None
+
+    def __init__(self, chunks: List[str]) -> None:
+        self.chunks = chunks
+        self.calls = 0
+
+    def invoke(self, messages: List[Dict[str, str]]) -> GeminiResponse:
+        self.calls += 1
+        return GeminiResponse(content="".join(self.chunks))
+
+    async def ainvoke(self, messages: List[Dict[str, str]]) -> GeminiResponse:
+        return self.invoke(messages)
+
+    def stream(self, messages: List[Dict[str, str]]):
+        self.calls += 1
+        for chunk in self.chunks:
+            yield GeminiResponse(content=chunk)
+
+    async def astream(self, messages: List[Dict[str, str]]):
+        self.calls += 1
+        for chunk in self.chunks:
+            yield GeminiResponse(content=chunk)
+
+
+def _cached(llm: FakeLLM) -> tuple[CachedLLM, LLMCache]:
+    cache = LLMCache(_MemoryCache(16, DEFAULT_TTL_S))
+    return CachedLLM(llm, cache), cache
+
+
+async def _collect(stream) -> str:
+    return "".join([chunk.content async for chunk in stream])
+
+
+def test_invoke_serves_repeats_from_cache():
+    llm = FakeLLM(["Framed ", "problem"])
+    cached, cache = _cached(llm)
+
+    assert cached.invoke(MESSAGES).content == "Framed problem"
+    assert cached.invoke(MESSAGES).content == "Framed problem"
+    assert llm.calls == 1
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_different_messages_miss():
+    llm = FakeLLM(["answer"])
+    cached, cache = _cached(llm)
+
+    cached.invoke(MESSAGES)
+    cached.invoke([{"role": "user", "content": "Another problem"}])
+    assert llm.calls == 2
+    assert cache.stats() == {"hits": 0, "misses": 2}
+
+
+def test_stream_caches_joined_reply():
+    llm = FakeLLM(["Framed ", "problem"])
+    cached, _ = _cached(llm)
+
+    assert "".join(chunk.content for chunk in cached.stream(MESSAGES)) == "Framed problem"
+    assert asyncio.run(_collect(cached.astream(MESSAGES))) == "Framed problem"
+    assert llm.calls == 1
+
+
+def test_error_replies_are_not_cached():
+    llm = FakeLLM([f"{ERROR_RESPONSE_PREFIX}quota exceeded"])
+    cached, _ = _cached(llm)
+
+    cached.invoke(MESSAGES)
+    cached.invoke(MESSAGES)
+    assert llm.calls == 2
+
+
+def test_stream_failing_after_partial_text_is_not_cached():
+    llm = FakeLLM(["Partial framing", f"{ERROR_RESPONSE_PREFIX}connection reset"])
+    cached, _ = _cached(llm)
+
+    list(cached.stream(MESSAGES))
+    asyncio.run(_collect(cached.astream(MESSAGES)))
+    assert llm.calls == 2
+
+
+class BrokenBackend(_MemoryCache):
+    def __init__(self) -> None:
+        super().__init__(16, DEFAULT_TTL_S)
+
+    def get(self, key: str) -> Optional[str]:
+        raise ConnectionError("cache unreachable")
+
+    def set(self, key: str, value: str, expire: Optional[float] = None) -> None:
+        raise ConnectionError("cache unreachable")
+
+
+def test_async_paths_serve_repeats_from_cache():
+    llm = FakeLLM(["Framed ", "problem"])
+    cached, cache = _cached(llm)
+
+    assert asyncio.run(cached.ainvoke(MESSAGES)).content == "Framed problem"
+    assert asyncio.run(_collect(cached.astream(MESSAGES))) == "Framed problem"
+    assert llm.calls == 1
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_backend_failures_fall_back_to_the_model():
+    llm = FakeLLM(["answer"])
+    cache = LLMCache(BrokenBackend())
+    cached = CachedLLM(llm, cache)
+
+    assert cached.invoke(MESSAGES).content == "answer"
+    assert asyncio.run(cached.ainvoke(MESSAGES)).content == "answer"
+    assert asyncio.run(_collect(cached.astream(MESSAGES))) == "answer"
+    assert llm.calls == 3
+    assert cache.stats() == {"hits": 0, "misses": 3}
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from contextlib import closing
+from typing import List
+
+import pytest
+
+from theory_council import rag
+from theory_council.rag import CONTEXT_PROMPT_HEADER, format_context_for_prompt
+
+
+def test_format_context_merges_chunks_from_the_same_page():
+    chunks = [
+        {"content": "Self-efficacy beliefs", "source": "bandura.pdf", "page": 3},
+        {"content": "Autonomy support", "source": "deci.pdf", "page": 7},
+        {"content": "shape persistence.", "source": "bandura.pdf", "page": 3},
+        {"content": "Mastery experiences", "source": "bandura.pdf", "page": 4},
+    ]
+
+    prompt = format_context_for_prompt(chunks)
+
+    assert prompt.startswith(CONTEXT_PROMPT_HEADER)
+    assert prompt.count("--- SOURCE") == 3
+    assert '--- SOURCE 1 (bandura.pdf, p.3) ---\n\n"Self-efficacy beliefs shape persistence."' in prompt
+    assert "--- SOURCE 2 (deci.pdf, p.7) ---" in prompt
+    assert "--- SOURCE 3 (bandura.pdf, p.4) ---" in prompt
+
+
+def test_format_context_is_empty_without_chunks():
+    assert format_context_for_prompt([]) == ""
+
+
+class FakeEmbeddings:
+    def __init__(self) -> None:
+        self.embedded: List[str] = []
+
+    def embed_documents(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
+        self.embedded.extend(texts)
+        return [[float(len(text)), 0.5, -0.25] for text in texts]
+
+
+@pytest.fixture()
+def embed_cache(tmp_path, monkeypatch: pytest.MonkeyPatch) -> FakeEmbeddings:
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(rag, "EMBED_CACHE_PATH", str(tmp_path / "cache" / "embeddings.sqlite"))
+    monkeypatch.setattr(rag, "_get_embeddings", lambda: embeddings)
+    rag._prepare_embed_cache()
+    return embeddings
+
+
+def test_embedding_cache_round_trips_and_only_embeds_misses(embed_cache: FakeEmbeddings):
+    first = rag._embed_with_cache(["alpha", "beta", "alpha"])
+    assert embed_cache.embedded == ["alpha", "beta"]
+    assert first == [[5.0, 0.5, -0.25], [4.0, 0.5, -0.25], [5.0, 0.5, -0.25]]
+
+    second = rag._embed_with_cache(["beta", "gamma"])
+    assert embed_cache.embedded == ["alpha", "beta", "gamma"]
+    assert second == [first[1], [5.0, 0.5, -0.25]]
+
+
+def test_embedding_cache_setup_drops_the_float32_table(embed_cache: FakeEmbeddings):
+    with closing(sqlite3.connect(rag.EMBED_CACHE_PATH)) as conn, conn:
+        conn.execute("CREATE TABLE embeddings (hash TEXT PRIMARY KEY, vec BLOB)")
+
+    rag._embed_with_cache(["alpha"])
+    with closing(sqlite3.connect(rag.EMBED_CACHE_PATH)) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    # Write batches leave the schema alone; only the once-per-build setup migrates it.
+    assert tables == {"embeddings", "embeddings_f16"}
+
+    rag._prepare_embed_cache()
+
+    with closing(sqlite3.connect(rag.EMBED_CACHE_PATH)) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {"embeddings_f16"}
+
+
+class FakeDocument:
+    def __init__(self, source: str) -> None:
+        self.page_content = f"content from {source}"
+        self.metadata = {"source": source, "page": 0}
+
+
+class FakeVectorStore:
+    searches: List[List[float]] = []
+    source = "bandura.pdf"
+
+    def __init__(self, **_) -> None:
+        pass
+
+    def similarity_search_by_vector(self, embedding, k, filter=None):
+        self.searches.append(embedding)
+        return [FakeDocument(self.source)]
+
+
+class FakeQueryEmbeddings:
+    # Two nearly parallel vectors (cosine ~0.995) and one far from both (~0.93).
+    VECTORS = {
+        "self-efficacy": [1.0, 0.0],
+        "self efficacy beliefs": [1.0, 0.1],
+        "autonomy support": [1.0, 0.4],
+    }
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.VECTORS[text]
+
+
+@pytest.fixture()
+def vector_store(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    embeddings = FakeQueryEmbeddings()
+    get_embeddings = lambda: embeddings
+    get_embeddings.cache_clear = lambda: None
+    FakeVectorStore.searches = []
+    FakeVectorStore.source = "bandura.pdf"
+    monkeypatch.setattr(rag, "DB_DIR", str(tmp_path / "db"))
+    monkeypatch.setattr(rag, "Chroma", FakeVectorStore)
+    monkeypatch.setattr(rag, "_get_embeddings", get_embeddings)
+    os.makedirs(rag.DB_DIR)
+    rag._reset_index_handles()
+    yield FakeVectorStore.searches
+    rag._reset_index_handles()
+
+
+def test_semantic_query_cache_serves_near_duplicates(vector_store: List[List[float]]):
+    first = rag.query_context("self-efficacy")
+    assert rag.query_context("self efficacy beliefs") == first
+    assert len(vector_store) == 1
+
+    rag.query_context("autonomy support")
+    rag.query_context("self-efficacy", k=2)
+    assert len(vector_store) == 3
+    assert first[0]["source"] == "bandura.pdf"
+
+
+def test_build_index_invalidates_the_query_caches(
+    vector_store: List[List[float]], monkeypatch: pytest.MonkeyPatch
+):
+    rag.query_context("self-efficacy")
+
+    def create_collection():
+        os.makedirs(rag.DB_DIR, exist_ok=True)
+        return object()
+
+    page = rag.Document(page_content="page", metadata={"source": "/x/a.pdf", "page": 0})
+    monkeypatch.setattr(rag, "_iter_context_pdfs", lambda: iter([[page]]))
+    monkeypatch.setattr(rag, "_create_collection", create_collection)
+    monkeypatch.setattr(rag, "_write_chunks", lambda collection, splits: None)
+    rag.build_index(force_refresh=True)
+
+    rag.query_context("self-efficacy")
+    rag.query_context("self efficacy beliefs")
+    assert len(vector_store) == 2
+
+
+def test_query_context_strips_absolute_paths_from_older_stores(vector_store: List[List[float]]):
+    FakeVectorStore.source = "/srv/app/context/Social Cognitive Theory/bandura.pdf"
+
+    assert rag.query_context("self-efficacy")[0]["source"] == "bandura.pdf"
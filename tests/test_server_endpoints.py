@@ -1,13 +1,14 @@
 from __future__ import annotations
 
-from copy import deepcopy
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 
+import orjson
 import pytest
 from fastapi.testclient import TestClient
 
 from theory_council import server
 from theory_council import conversation
+from theory_council.orchestration import InMemorySessionStore
 
 FAKE_RESULT_TEMPLATE: Dict[str, Any] = {
     "raw_problem": "Base problem",
@@ -42,15 +43,17 @@ FAKE_RESULT_TEMPLATE: Dict[str, Any] = {
         },
     ],
 }
+# Serialized once; each fake run decodes a fresh copy instead of deep-copying the template.
+FAKE_RESULT_JSON = orjson.dumps(FAKE_RESULT_TEMPLATE)
 
 
 @pytest.fixture(autouse=True)
 def stub_dependencies(monkeypatch: pytest.MonkeyPatch):
     server.RUN_LOG.clear()
-    server.SESSION_STORE = server.InMemorySessionStore()
+    server.SESSION_STORE = InMemorySessionStore()
 
     def fake_run(problem: str, *_, **__) -> Dict[str, Any]:
-        result = deepcopy(FAKE_RESULT_TEMPLATE)
+        result = orjson.loads(FAKE_RESULT_JSON)
         result["raw_problem"] = problem
         return result
 
@@ -61,9 +64,17 @@ def stub_dependencies(monkeypatch: pytest.MonkeyPatch):
             "model": "stub",
         }
 
+    async def fake_arun(problem: str, *_, **__) -> Dict[str, Any]:
+        return fake_run(problem)
+
+    async def fake_achat(messages, metadata=None):
+        return fake_chat(messages, metadata=metadata)
+
     monkeypatch.setattr(server, "run_council_pipeline", fake_run)
     monkeypatch.setattr(conversation, "run_council_pipeline", fake_run)
     monkeypatch.setattr(conversation, "generate_chat_response", fake_chat)
+    monkeypatch.setattr(conversation, "arun_council_pipeline", fake_arun)
+    monkeypatch.setattr(conversation, "agenerate_chat_response", fake_achat)
 
 
 @pytest.fixture()
@@ -80,6 +91,44 @@ def test_council_run_returns_structured_payload(client: TestClient):
     assert "agent_traces" in data["result"]
 
 
+def test_get_council_run_returns_stored_response(client: TestClient):
+    created = client.post("/council/run", json={"problem": "Lookup issue"}).json()
+    response = client.get(f"/council/run/{created['run_id']}")
+    assert response.status_code == 200
+    assert response.json() == created
+    assert client.get("/council/run/missing").status_code == 404
+
+
+def test_run_log_evicts_least_recent_runs(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(server, "RUN_LOG", server.LRUCache(maxsize=1))
+    first = client.post("/council/run", json={"problem": "first"}).json()
+    second = client.post("/council/run", json={"problem": "second"}).json()
+    assert client.get(f"/council/run/{first['run_id']}").status_code == 404
+    assert client.get(f"/council/run/{second['run_id']}").status_code == 200
+
+
+class SharedRunStore(InMemorySessionStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.runs: Dict[str, Any] = {}
+
+    def record_council_run(self, session_id, run_id, result):
+        self.runs[run_id] = {"result": result, "session_id": session_id}
+        return super().record_council_run(session_id, run_id, result)
+
+    def get_run_record(self, run_id):
+        return self.runs.get(run_id)
+
+
+def test_get_council_run_from_shared_store_keeps_session_id(client: TestClient):
+    server.SESSION_STORE = SharedRunStore()
+    created = client.post("/council/run", json={"problem": "Shared", "session_id": "s1"}).json()
+    server.RUN_LOG.clear()
+    response = client.get(f"/council/run/{created['run_id']}")
+    assert response.json() == created
+    assert response.json()["session_id"] == "s1"
+
+
 def test_conversation_endpoint_runs_agent_mode(client: TestClient):
     payload = {
         "messages": [{"role": "user", "content": "Need agent help"}],
@@ -102,9 +151,69 @@ def test_conversation_endpoint_runs_chat_mode(client: TestClient):
     assert data["assistant_message"]["content"] == "ok"
 
 
-def test_streaming_endpoint_replays_agent_updates(client: TestClient):
+def _sse_frames(body: str) -> List[Tuple[str, Dict[str, Any]]]:
+    frames = []
+    for block in body.strip().split("\n\n"):
+        event_line, data_line = block.split("\n", 1)
+        frames.append((event_line.removeprefix("event: "), orjson.loads(data_line.removeprefix("data: "))))
+    return frames
+
+
+def test_streaming_endpoint_replays_agent_updates(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    template = orjson.loads(FAKE_RESULT_JSON)
+    framer_trace, integrator_trace = template["agent_traces"]
+
+    async def fake_events(problem: str, *_, **__):
+        yield "updates", {"problem_framer": {"framed_problem": "Framed", "agent_traces": [framer_trace]}}
+        yield "custom", {"agent_key": "sct", "chunk": "theory tokens stay server-side"}
+        yield "custom", {"agent_key": "integrator", "chunk": "1. Problem Framing"}
+        yield "custom", {"section": "problem_framing", "content": "PF"}
+        yield "updates", {
+            "integrator": {"final_synthesis": template["final_synthesis"], "agent_traces": [integrator_trace]}
+        }
+
+    monkeypatch.setattr(server, "astream_council_events", fake_events)
     with client.stream("POST", "/council/run/stream", json={"problem": "Stream me"}) as stream:
         body = "".join(list(stream.iter_text()))
-    assert "event: trace" in body
-    assert "event: complete" in body
 
+    frames = _sse_frames(body)
+    assert [event for event, _ in frames] == [
+        "started", "trace_batch", "token", "section", "trace_batch", "complete",
+    ]
+    assert frames[1][1]["traces"] == [framer_trace]
+    assert frames[2][1] == {"agent_key": "integrator", "chunk": "1. Problem Framing"}
+    assert frames[3][1]["key"] == "problem_framing"
+    run = frames[-1][1]["run"]
+    assert run["result"]["raw_problem"] == "Stream me"
+    assert run["result"]["agent_traces"] == [framer_trace, integrator_trace]
+    assert client.get(f"/council/run/{run['run_id']}").status_code == 200
+
+
+
+def test_chat_stream_coalesces_tokens(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    async def fake_stream(messages, metadata=None):
+        for token in ["Hel", "lo", " ", "there"]:
+            yield token
+
+    monkeypatch.setattr(server, "astream_chat_response", fake_stream)
+    payload = {"messages": [{"role": "user", "content": "hi"}]}
+    with client.stream("POST", "/conversation/send/stream", json=payload) as stream:
+        body = "".join(list(stream.iter_text()))
+    assert body.count("event: token") < 4
+    assert 'event: token\ndata: {"chunk":"Hello there"}' in body
+    assert '"content":"Hello there"' in body
+
+
+def test_council_run_renders_unicode_synthesis(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    synthesis = "Théorie — intervention 🎯 " * 500
+
+    def fake_run(problem: str, *_, **__) -> Dict[str, Any]:
+        result = orjson.loads(FAKE_RESULT_JSON)
+        result["final_synthesis"] = synthesis
+        return result
+
+    monkeypatch.setattr(server, "run_council_pipeline", fake_run)
+    response = client.post("/council/run", json={"problem": "Unicode"})
+    assert response.headers["content-type"] == "application/json"
+    assert "Théorie — intervention 🎯".encode() in response.content
+    assert response.json()["result"]["final_synthesis"] == synthesis
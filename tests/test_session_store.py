@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from theory_council import orchestration
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the redis-py calls RedisSessionStore makes; counts round trips.
+    """
+
+    def __init__(self) -> None:
+        self.strings: Dict[str, bytes] = {}
+        self.hashes: Dict[str, Dict[str, bytes]] = {}
+        self.lists: Dict[str, List[bytes]] = {}
+        self.ttls: Dict[str, int] = {}
+        self.round_trips = 0
+
+    @staticmethod
+    def _bytes(value: Any) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    def get(self, key: str) -> Optional[bytes]:
+        self.round_trips += 1
+        return self.strings.get(key)
+
+    def _set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        self.strings[key] = self._bytes(value)
+        if ex:
+            self.ttls[key] = ex
+        return True
+
+    def _hset(self, key: str, field: str, value: Any) -> int:
+        self.hashes.setdefault(key, {})[field] = self._bytes(value)
+        return 1
+
+    def _hget(self, key: str, field: str) -> Optional[bytes]:
+        return self.hashes.get(key, {}).get(field)
+
+    def _delete(self, key: str) -> int:
+        return int(self.lists.pop(key, None) is not None)
+
+    def _rpush(self, key: str, *values: Any) -> int:
+        items = self.lists.setdefault(key, [])
+        items.extend(self._bytes(value) for value in values)
+        return len(items)
+
+    def _lrange(self, key: str, start: int, end: int) -> List[bytes]:
+        return list(self.lists.get(key, []))
+
+    def _expire(self, key: str, seconds: int) -> bool:
+        self.ttls[key] = seconds
+        return True
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis) -> None:
+        self._client = client
+        self._commands: List[Any] = []
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._client, f"_{name}")
+        return lambda *args, **kwargs: self._commands.append((method, args, kwargs))
+
+    def execute(self) -> List[Any]:
+        self._client.round_trips += 1
+        return [method(*args, **kwargs) for method, args, kwargs in self._commands]
+
+
+@pytest.fixture()
+def fake_redis(monkeypatch: pytest.MonkeyPatch) -> FakeRedis:
+    client = FakeRedis()
+    monkeypatch.setattr(orchestration, "redis", SimpleNamespace(Redis=SimpleNamespace(from_url=lambda url: client)))
+    return client
+
+
+def test_redis_store_round_trips_messages_and_runs(fake_redis: FakeRedis):
+    store = orchestration.RedisSessionStore("redis://stub", ttl_seconds=60)
+    assert store.get("s1") is None
+
+    store.replace_messages("s1", [{"role": "user", "content": "hi"}])
+    session = store.append_message("s1", {"role": "assistant", "content": "hello"})
+    assert [m["content"] for m in session["messages"]] == ["hi", "hello"]
+    assert session["last_run_id"] is None
+
+    result = {"final_synthesis": "Synthesis"}
+    session = store.record_council_run("s1", "run-1", result)
+    assert session["last_run_id"] == "run-1"
+    assert session["last_council_result"] == result
+    assert store.get_run("run-1") == result
+    assert store.get_run("missing") is None
+    assert store.get_run_record("run-1") == {"result": result, "session_id": "s1"}
+
+    session = store.get("s1")
+    assert session["last_council_result"] == result
+    assert fake_redis.ttls["theory_council:messages:s1"] == 60
+
+
+def test_redis_store_write_round_trips(fake_redis: FakeRedis):
+    store = orchestration.RedisSessionStore("redis://stub")
+
+    fake_redis.round_trips = 0
+    store.replace_messages("s1", [{"role": "user", "content": "hi"}])
+    assert fake_redis.round_trips == 1
+
+    fake_redis.round_trips = 0
+    store.record_council_run("s1", "run-1", {"final_synthesis": "Synthesis"})
+    assert fake_redis.round_trips == 1
+
+    # Once the session has a run, the read-back also fetches that run.
+    fake_redis.round_trips = 0
+    store.append_message("s1", {"role": "assistant", "content": "hello"})
+    assert fake_redis.round_trips == 2